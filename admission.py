@@ -0,0 +1,198 @@
+"""
+Admission control for agent turns: global concurrency limit, bounded queue, per-user fair scheduling
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Busy(Exception):
+    """Raised when a turn cannot be admitted; the caller should retry after retry_after_ms"""
+
+    def __init__(self, reason: str, retry_after_ms: int):
+        super().__init__(f"Server busy ({reason}), retry after {retry_after_ms} ms")
+        self.reason = reason
+        self.retry_after_ms = retry_after_ms
+
+
+class _Waiter:
+    __slots__ = ('event', 'loop', 'future', 'granted', 'enqueued_at')
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.event = threading.Event()
+        self.loop = loop
+        self.future: Optional[asyncio.Future] = loop.create_future() if loop is not None else None
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+    def wake(self) -> bool:
+        """Signal the waiter; returns False if its event loop has already gone away"""
+        self.event.set()
+        if self.future is not None:
+            try:
+                self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+            except RuntimeError:
+                return False
+        return True
+
+
+class AdmissionController:
+    """
+    Limits how many agent turns run at once.
+
+    Up to max_in_flight turns run; further callers wait in a bounded queue.
+    Waiters are grouped per key (user or session) and freed slots go to the
+    keys round-robin, so one client firing many prompts only gets its share.
+    A caller is rejected with Busy straight away when the queue, or its own
+    key's share of it, is full, and after max_wait seconds in the queue.
+    """
+
+    def __init__(self, max_in_flight: Optional[int] = None, max_queue: Optional[int] = None,
+                 max_queued_per_key: Optional[int] = None, max_wait: Optional[float] = None):
+        self.max_in_flight = max_in_flight or int(os.getenv('ADMISSION_MAX_IN_FLIGHT', '16'))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv('ADMISSION_MAX_QUEUE', '64'))
+        self.max_queued_per_key = max_queued_per_key or int(os.getenv('ADMISSION_MAX_QUEUED_PER_KEY', '4'))
+        self.max_wait = max_wait or float(os.getenv('ADMISSION_MAX_WAIT', '30'))
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits_ms: Deque[float] = deque(maxlen=1024)
+        # Moving average of how long a turn holds its slot, used for retry hints
+        self._avg_turn_s = 5.0
+
+    def _retry_after_ms(self) -> int:
+        """Rough time until a slot frees up for a new caller"""
+        rounds = 1 + self.queued / self.max_in_flight
+        return int(min(self.max_wait, self._avg_turn_s * rounds) * 1000)
+
+    def _enqueue(self, key: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[_Waiter]:
+        """Take a free slot (returns None) or join key's queue (returns the waiter); raises Busy"""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self.queued:
+                self.in_flight += 1
+                self.admitted += 1
+                self._waits_ms.append(0.0)
+                return None
+
+            queue = self._queues.get(key)
+            if self.queued >= self.max_queue or (queue and len(queue) >= self.max_queued_per_key):
+                self.rejected += 1
+                reason = "queue full" if self.queued >= self.max_queue else "too many queued requests for this user"
+                raise Busy(reason, self._retry_after_ms())
+
+            waiter = _Waiter(loop)
+            if queue is None:
+                queue = self._queues[key] = deque()
+            queue.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _abandon(self, key: str, waiter: _Waiter) -> bool:
+        """Leave the queue; returns True if a slot was granted at the last moment instead"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            queue = self._queues.get(key)
+            if queue is not None and waiter in queue:
+                queue.remove(waiter)
+                if not queue:
+                    del self._queues[key]
+            self.queued -= 1
+            return False
+
+    def _admitted(self, waiter: _Waiter) -> float:
+        waited_ms = (time.monotonic() - waiter.enqueued_at) * 1000
+        with self._lock:
+            self._waits_ms.append(waited_ms)
+        return waited_ms
+
+    def _timed_out(self) -> Busy:
+        with self._lock:
+            self.timed_out += 1
+            return Busy("queue wait timed out", self._retry_after_ms())
+
+    def acquire(self, key: str) -> float:
+        """Block until admitted; returns the time spent queued in ms or raises Busy"""
+        waiter = self._enqueue(key)
+        if waiter is None:
+            return 0.0
+
+        waiter.event.wait(self.max_wait)
+        if not waiter.granted and not self._abandon(key, waiter):
+            raise self._timed_out()
+        return self._admitted(waiter)
+
+    async def acquire_async(self, key: str) -> float:
+        """acquire() for coroutines: waits without holding a thread"""
+        waiter = self._enqueue(key, asyncio.get_running_loop())
+        if waiter is None:
+            return 0.0
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if not self._abandon(key, waiter):
+                raise self._timed_out()
+        except asyncio.CancelledError:
+            # Hand back a slot granted while the caller was being cancelled
+            if self._abandon(key, waiter):
+                self.release()
+            raise
+        return self._admitted(waiter)
+
+    def release(self, held_s: Optional[float] = None) -> None:
+        """Free a slot and hand it to the next key in round-robin order"""
+        with self._lock:
+            if held_s is not None:
+                self._avg_turn_s = 0.9 * self._avg_turn_s + 0.1 * held_s
+
+            # A freed slot passes straight to the next waiter, so in_flight only drops when nobody waits
+            while self._queues:
+                key, queue = next(iter(self._queues.items()))
+                waiter = queue.popleft()
+                del self._queues[key]
+                if queue:
+                    self._queues[key] = queue
+                self.queued -= 1
+                waiter.granted = True
+                if waiter.wake():
+                    self.admitted += 1
+                    return
+
+            self.in_flight -= 1
+
+    @contextmanager
+    def slot(self, key: str) -> Iterator[float]:
+        """Context manager around acquire()/release(); yields the queue wait in ms"""
+        waited_ms = self.acquire(key)
+        start = time.monotonic()
+        try:
+            yield waited_ms
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits_ms)
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": self.queued,
+                "queued_keys": len(self._queues),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms_p50": round(waits[len(waits) // 2], 1) if waits else 0.0,
+                "wait_ms_p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 1) if waits else 0.0
+            }
@@ -3,14 +3,45 @@
 Strands AgentCore App with AgentCore native memory management
 """
 
+# First import: its clock starts the import-time report
+import startup
+
 import os
 import json
+import time
+import asyncio
 import logging
-from typing import Dict, Any
+import warnings
+from contextlib import asynccontextmanager
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, List, Optional, Union
+import anyio.to_thread
 from strands import Agent
+from strands.models import BedrockModel, CacheConfig
+from strands.models.model import CacheToolsConfig
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
-from web_search_tool import web_search
-from knowledge_base_tool import knowledge_search
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from aws_clients import client_config, get_client
+from session_pool import AgentPool
+from admission import AdmissionController, Busy
+from conversation import BoundedConversationManager, turn_usage
+from model_router import LARGE, MEDIUM, SMALL, TierRouter
+from observability import (
+    TracingHooks, instrument_client, record_ttft, record_usage, register_collector, render_metrics, trace_turn
+)
+from web_search_tool import web_search, web_search_async, web_cache, web_flight, warm_connection, prefetch_search
+from knowledge_base_tool import (
+    knowledge_search, get_local_index, invalidate_kb_cache, kb_cache, kb_flight, on_kb_invalidation, retrieve_chunks
+)
+from answer_cache import AnswerCache, cache_metadata, cached_exchange, fingerprint
+from research_tool import research
+from prefetch import Prefetcher, in_thread
+from disk_cache import shared_disk_cache
+import context_packing
+
+startup.mark("imports")
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,45 +50,461 @@ logger = logging.getLogger(__name__)
 # Set environment for tool consent
 os.environ["BYPASS_TOOL_CONSENT"] = "true"
 
+CHECKOUT_WORKERS = int(os.getenv("AGENT_CHECKOUT_WORKERS", "64"))
+
+
+@asynccontextmanager
+async def _lifespan(app: Any) -> AsyncIterator[None]:
+    """
+    Non-streaming turns run in the server's thread pool (anyio, 40 threads by default)
+    and hold a thread while they wait for their session and for an admission slot.
+    The pool is grown to cover every running and queued turn plus CHECKOUT_WORKERS
+    turns waiting on their session, so excess requests reach admission and are
+    rejected as busy instead of waiting unseen for a thread.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    needed = admission.max_in_flight + admission.max_queue + CHECKOUT_WORKERS
+    if limiter.total_tokens < needed:
+        logger.info(f"Handler thread pool: {limiter.total_tokens} -> {needed} threads")
+        limiter.total_tokens = needed
+    yield
+
+
 # Initialize BedrockAgentCoreApp
-app = BedrockAgentCoreApp()
+app = BedrockAgentCoreApp(lifespan=_lifespan)
+
+# The async web search shares one keep-alive connection pool and does not hold a thread while waiting on Tavily
+web_tool = web_search_async if os.getenv("WEB_SEARCH_ASYNC", "true").lower() == "true" else web_search
 
-# Initialize Strands agent with enhanced autonomous reasoning
-agent = Agent(
-    tools=[web_search, knowledge_search],
-    system_prompt="""You are an intelligent research assistant with autonomous reasoning capabilities.
+SYSTEM_PROMPT = """You are an intelligent research assistant with autonomous reasoning capabilities.
 
 For each query:
 1. Analyze if you need current information (use web_search)
-2. Check if domain knowledge is needed (use knowledge_search)  
-3. For complex topics, use BOTH tools to cross-validate information
-4. Think step-by-step and explain your reasoning
-5. Provide comprehensive, well-researched responses
+2. Check if domain knowledge is needed (use knowledge_search; pass alternative phrasings together as queries)
+3. For complex topics, use research to query BOTH sources at once and cross-validate information
+4. When you need several lookups, request them together in one step rather than one after another
+5. Think step-by-step and explain your reasoning
+6. Provide comprehensive, well-researched responses
 
 Always be thorough but concise. Use multiple tools when beneficial."""
-)
+
+TOOLS = [web_tool, knowledge_search, research]
+
+# Bedrock prompt caching: the system prompt and tool specs never change, so
+# every turn after the first reads them from cache. With PROMPT_CACHE_HISTORY
+# the conversation so far is cached as well, which the model calls of a
+# tool-using turn and follow-up turns of a session reuse.
+PROMPT_CACHE = os.getenv("PROMPT_CACHE", "true").lower() == "true"
+PROMPT_CACHE_HISTORY = os.getenv("PROMPT_CACHE_HISTORY", "true").lower() == "true"
+PROMPT_CACHE_TTL = os.getenv("PROMPT_CACHE_TTL") or None
+
+
+def prompt_cache_options() -> Dict[str, Any]:
+    """BedrockModel options that place cache points after the tool specs, system prompt and (optionally) history"""
+    if not PROMPT_CACHE:
+        return {}
+    if PROMPT_CACHE_HISTORY:
+        # Strands also moves a cache point to the last user message on every call
+        return {"cache_config": CacheConfig(strategy="auto", ttl=PROMPT_CACHE_TTL, tools_ttl=True)}
+    # CacheConfig always caches history, so the static prefix alone needs the model-level tools
+    # option plus the cache point placed at the end of system_prompt() below
+    return {"cache_tools": CacheToolsConfig(type="default", ttl=PROMPT_CACHE_TTL)}
+
+
+def system_prompt() -> Union[str, List[Dict[str, Any]]]:
+    if PROMPT_CACHE and not PROMPT_CACHE_HISTORY:
+        cache_point = {"type": "default", **({"ttl": PROMPT_CACHE_TTL} if PROMPT_CACHE_TTL else {})}
+        return [{"text": SYSTEM_PROMPT}, {"cachePoint": cache_point}]
+    return SYSTEM_PROMPT
+
+
+# Off by default: until ROUTER_SMALL_MODEL_ID names a model smaller than the medium one,
+# routing only takes tools away from short prompts
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "false").lower() == "true"
+ROUTER_MEDIUM_MODEL_ID = os.getenv("ROUTER_MEDIUM_MODEL_ID", "global.anthropic.claude-haiku-4-5-20251001-v1:0")
+ROUTER_SMALL_MODEL_ID = os.getenv("ROUTER_SMALL_MODEL_ID", ROUTER_MEDIUM_MODEL_ID)
+
+_bedrock_models: Dict[str, BedrockModel] = {}
+
+
+def bedrock_model(model_id: Optional[str] = None) -> BedrockModel:
+    """One model (and so one pooled bedrock-runtime client) per model id, shared by every session's agent"""
+    key = model_id or ""
+    if key not in _bedrock_models:
+        with warnings.catch_warnings():
+            # cache_tools is deprecated upstream but is the only tools-only cache option
+            warnings.simplefilter("ignore", DeprecationWarning)
+            _bedrock_models[key] = BedrockModel(
+                boto_client_config=client_config(),
+                **prompt_cache_options(),
+                **({"model_id": model_id} if model_id else {})
+            )
+        instrument_client(_bedrock_models[key].client)
+    return _bedrock_models[key]
+
+
+STUB_BACKENDS = os.getenv("AGENT_STUB_BACKENDS", "false").lower() == "true"
+
+if STUB_BACKENDS:
+    # Offline load runs: stub model, knowledge base and Tavily
+    from stubs import use_stub_backends
+    model = use_stub_backends()
+else:
+    model = bedrock_model(os.getenv("BEDROCK_MODEL_ID"))
+
+# Chat goes to the small model without tools, standard questions to the
+# mid-tier model, multi-step research to the large (configured default) one
+tier_models = {LARGE: model}
+if MODEL_ROUTING:
+    tier_models[SMALL] = model if STUB_BACKENDS else bedrock_model(ROUTER_SMALL_MODEL_ID)
+    tier_models[MEDIUM] = model if STUB_BACKENDS else bedrock_model(ROUTER_MEDIUM_MODEL_ID)
+router = TierRouter(tier_models)
+
+startup.mark("model_init")
+
+
+def build_agent() -> Agent:
+    """Build a per-session Strands agent from the shared model, tools and prompt"""
+    return Agent(
+        model=model,
+        tools=TOOLS,
+        system_prompt=system_prompt(),
+        # Last N turns verbatim, older ones summarized, so per-turn input tokens plateau
+        conversation_manager=BoundedConversationManager(),
+        # Model and tool calls become spans on the current turn's trace
+        hooks=[TracingHooks()],
+        callback_handler=None
+    )
+
+
+# One agent per session_id so histories never mix and sessions run in parallel
+agent_pool = AgentPool(build_agent)
+
+# Caps concurrent agent loops; queued turns are scheduled fairly across users
+admission = AdmissionController()
+
+# Opt-in: a first-turn prompt answered before (same prompt, model, system prompt and tools)
+# is served from cache without running the agent; answers go stale with the KB
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "false").lower() == "true"
+# Tools whose results come from the web, so answers using them expire with the web cache
+WEB_RESULT_TOOLS = frozenset(("web_search", "research"))
+answer_cache = AnswerCache(fingerprint(SYSTEM_PROMPT, TOOLS))
+on_kb_invalidation(answer_cache.clear)
+
+# Opt-in: web and KB lookups of the raw prompt start alongside the first model call
+PREFETCH = os.getenv("PREFETCH", "false").lower() == "true"
+
+
+def _prefetch_starters() -> Dict[str, Any]:
+    starters: Dict[str, Any] = {}
+    if os.getenv("TAVILY_API_KEY"):
+        starters["web"] = prefetch_search
+    # In generate mode knowledge_search never calls retrieve_chunks
+    if os.getenv("KNOWLEDGE_BASE_ID") and os.getenv("KB_SEARCH_MODE", "retrieve").lower() == "retrieve":
+        starters["kb"] = in_thread(retrieve_chunks)
+    return starters
+
+
+prefetcher = Prefetcher(_prefetch_starters())
+
+# Component gauges exported on /metrics next to the latency histograms
+register_collector("sessions", agent_pool.stats)
+register_collector("admission", admission.stats)
+register_collector("web_cache", web_cache.stats)
+register_collector("kb_cache", kb_cache.stats)
+register_collector("web_singleflight", web_flight.stats)
+register_collector("kb_singleflight", kb_flight.stats)
+register_collector("router", router.stats)
+register_collector("prefetch", prefetcher.stats)
+register_collector("context_packing", context_packing.stats)
+register_collector("answer_cache", answer_cache.stats)
+if shared_disk_cache() is not None:
+    register_collector("disk_cache", shared_disk_cache().stats)
+register_collector("startup", startup.summary)
+if get_local_index() is not None:
+    register_collector("kb_index", get_local_index().stats)
+
+startup.mark("app_init")
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+app.add_route("/metrics", metrics, methods=["GET"])
+
+
+def _success_response(session_id: str, message: Any, usage: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "response": {
+            "role": "assistant",
+            "content": [{"text": message}]
+        },
+        "session_id": session_id,
+        "usage": usage,
+        "status": "success"
+    }
+
+
+def _busy_response(session_id: str, busy: Busy) -> Dict[str, Any]:
+    return {
+        "error": str(busy),
+        "retry_after_ms": busy.retry_after_ms,
+        "session_id": session_id,
+        "status": "busy"
+    }
+
+
+def _admission_key(payload: Dict[str, Any]) -> str:
+    """Fairness is per user when the caller identifies one, otherwise per session"""
+    return payload.get("user_id") or payload.get("session_id", "default-session")
+
+
+def _prefetch_enabled(payload: Dict[str, Any], route: Any) -> bool:
+    """Per request via payload "prefetch", else PREFETCH; never for the tool-free small tier"""
+    return payload.get("prefetch", PREFETCH) and route.tier != SMALL
+
+
+def _answer_cache_enabled(payload: Dict[str, Any]) -> bool:
+    """Per request via payload "answer_cache", else ANSWER_CACHE"""
+    return payload.get("answer_cache", ANSWER_CACHE)
+
+
+def _model_id(route: Any) -> Optional[str]:
+    return router.model_for(route).config.get("model_id")
+
+
+def _serve_cached(payload: Dict[str, Any], route: Any) -> Optional[Dict[str, Any]]:
+    """
+    The cached answer for a first turn, or None. A hit becomes the session's
+    history, so follow-up turns see the exchange as if the agent had run.
+    """
+    user_message = payload.get("prompt", "Hello")
+    session_id = payload.get("session_id", "default-session")
+    existing = agent_pool.peek(session_id)
+    if existing is not None and existing.messages:
+        return None
+    entry = answer_cache.get(user_message, route.tier, _model_id(route))
+    if entry is None:
+        return None
+    with agent_pool.session(session_id) as agent:
+        # Another turn of the session may have finished while this one waited for the agent
+        if agent.messages:
+            return None
+        agent.messages.extend(cached_exchange(user_message, entry))
+    return entry
+
+
+def _remember_answer(payload: Dict[str, Any], route: Any, result: Any) -> None:
+    """Cache a first turn's answer, unless the turn stopped early or a tool call failed"""
+    tools = result.metrics.tool_metrics
+    if result.stop_reason != "end_turn" or any(metrics.error_count for metrics in tools.values()):
+        return
+    # An answer built on web results is served no longer than the results themselves
+    ttl = web_cache.ttl if WEB_RESULT_TOOLS & tools.keys() else None
+    answer_cache.set(payload.get("prompt", "Hello"), route.tier, _model_id(route), result.message,
+                     sum(metrics.call_count for metrics in tools.values()), ttl=ttl)
+
+
+def _cached_response(session_id: str, entry: Dict[str, Any], route: Any) -> Dict[str, Any]:
+    # No model was called, so the turn used no tokens
+    response = _success_response(session_id, entry["message"], {"inputTokens": 0, "outputTokens": 0,
+                                                                 "totalTokens": 0})
+    # Not recorded: a cache hit's latency says nothing about its tier's model
+    response["route"] = router.describe(route)
+    response["answer_cache"] = cache_metadata(entry)
+    return response
+
+
+def _log_usage(session_id: str, usage: Dict[str, Any]) -> Dict[str, Any]:
+    record_usage(usage)
+    logger.info(
+        f"Turn usage for session {session_id[:20]}: input={usage.get('inputTokens', 0)} "
+        f"output={usage.get('outputTokens', 0)} cache_read={usage.get('cacheReadInputTokens', 0)} "
+        f"cache_write={usage.get('cacheWriteInputTokens', 0)} context={usage.get('contextTokens', 'n/a')}"
+    )
+    return usage
+
+
+# Checkouts wait on the session's previous turn. They get their own threads so waiting turns
+# cannot fill the default executor, which the running turns' tools need in order to finish
+_checkout_executor = ThreadPoolExecutor(max_workers=CHECKOUT_WORKERS, thread_name_prefix="checkout")
+
+
+async def _checkout_async(session_id: str) -> Agent:
+    """Check out a session's agent without blocking the event loop"""
+    future = asyncio.get_running_loop().run_in_executor(_checkout_executor, agent_pool.checkout, session_id)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The checkout still completes in its thread; hand the agent straight back
+        future.add_done_callback(lambda f: f.exception() is None and agent_pool.release(session_id))
+        raise
+
+
+async def stream_invoke(payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream one turn as events: text deltas, tool_start/tool_end, then a final
+    event carrying the same response body as the non-streaming path.
+    """
+    user_message = payload.get("prompt", "Hello")
+    session_id = payload.get("session_id", "default-session")
+    start = time.perf_counter()
+    first_token_ms = None
+    tool_calls = 0
+
+    logger.info(f"Streaming message for session: {session_id[:20]}...")
+
+    route = router.route(user_message, payload.get("model_tier"))
+    if _answer_cache_enabled(payload):
+        # Checking out the session's agent may wait on another of its turns, so off the event loop
+        entry = await asyncio.get_running_loop().run_in_executor(_checkout_executor, _serve_cached, payload, route)
+        if entry is not None:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            yield {"type": "text", "delta": "".join(b.get("text", "") for b in entry["message"]["content"])}
+            yield {"type": "final", **_cached_response(session_id, entry, route),
+                   "summary": {"stop_reason": "end_turn", "tool_calls": 0, "queue_ms": 0.0,
+                               "time_to_first_token_ms": elapsed_ms, "total_ms": elapsed_ms}}
+            return
+
+    # The session's agent first, then a global slot: a turn queued behind another turn of its
+    # own session must not hold a slot other users could run in
+    try:
+        agent = await _checkout_async(session_id)
+    except Exception as e:
+        logger.error(f"Error processing message: {e}")
+        yield {"type": "error", "error": str(e), "session_id": session_id, "status": "error"}
+        return
+
+    try:
+        queue_ms = await admission.acquire_async(_admission_key(payload))
+    except Busy as e:
+        agent_pool.release(session_id)
+        logger.warning(f"Rejected turn for session {session_id[:20]}: {e}")
+        yield {"type": "busy", **_busy_response(session_id, e)}
+        return
+    except BaseException:
+        agent_pool.release(session_id)
+        raise
+    admitted_at = time.monotonic()
+
+    try:
+        first_turn = not agent.messages
+        agent.model = router.model_for(route)
+        turn_start = time.perf_counter()
+        with trace_turn(session_id) as trace, prefetcher.turn(user_message, _prefetch_enabled(payload, route)):
+            result = None
+            async for event in agent.stream_async(user_message):
+                if "data" in event:
+                    if first_token_ms is None:
+                        first_token_ms = round((time.perf_counter() - start) * 1000, 1)
+                        record_ttft(first_token_ms / 1000)
+                    yield {"type": "text", "delta": event["data"]}
+
+                elif "message" in event:
+                    # Tool calls start once the assistant message requesting them is complete,
+                    # and end when their results are appended as the next user message
+                    for block in event["message"].get("content", []):
+                        if "toolUse" in block:
+                            tool_calls += 1
+                            tool_use = block["toolUse"]
+                            yield {"type": "tool_start", "tool": tool_use["name"],
+                                   "tool_use_id": tool_use["toolUseId"], "input": tool_use.get("input")}
+                        elif "toolResult" in block:
+                            tool_result = block["toolResult"]
+                            yield {"type": "tool_end", "tool_use_id": tool_result["toolUseId"],
+                                   "status": tool_result.get("status", "success")}
+
+                elif "result" in event:
+                    result = event["result"]
+
+            if first_turn and _answer_cache_enabled(payload):
+                # The answer cache writes through to sqlite, so keep it off the event loop
+                await asyncio.to_thread(_remember_answer, payload, route, result)
+
+            final = {
+                "type": "final",
+                **_success_response(session_id, result.message, _log_usage(session_id, turn_usage(result))),
+                "route": router.record(route, (time.perf_counter() - turn_start) * 1000),
+                "summary": {
+                    "stop_reason": result.stop_reason,
+                    "tool_calls": tool_calls,
+                    "queue_ms": round(queue_ms, 1),
+                    "time_to_first_token_ms": first_token_ms,
+                    "total_ms": round((time.perf_counter() - start) * 1000, 1)
+                }
+            }
+            if payload.get("include_timings"):
+                final["timings"] = {**trace.phase_timings(), "queue_ms": round(queue_ms, 1)}
+        yield final
+
+    except Exception as e:
+        logger.error(f"Error streaming message: {e}")
+        yield {"type": "error", "error": str(e), "session_id": session_id, "status": "error"}
+
+    finally:
+        agent_pool.release(session_id)
+        admission.release(time.monotonic() - admitted_at)
+
 
 @app.entrypoint
-def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """Process user input with AgentCore native memory management"""
+def invoke(payload: Dict[str, Any]) -> Union[Dict[str, Any], AsyncIterator[Dict[str, Any]]]:
+    """
+    Process user input with AgentCore native memory management.
+
+    With "stream": true in the payload the runtime returns a text/event-stream
+    of stream_invoke() events; otherwise a single JSON response.
+    """
     try:
+        # Admin hook: drop cached KB results after the knowledge base is re-synced
+        if payload.get("action") == "invalidate_kb_cache":
+            invalidate_kb_cache()
+            return {"action": "invalidate_kb_cache", "status": "success"}
+
+        # Admin hook: concurrency and session pool gauges
+        if payload.get("action") == "stats":
+            return {"action": "stats", "admission": admission.stats(), "sessions": agent_pool.stats(),
+                    "status": "success"}
+
+        if payload.get("stream"):
+            return stream_invoke(payload)
+
         user_message = payload.get("prompt", "Hello")
         session_id = payload.get("session_id", "default-session")
         
         logger.info(f"Processing message for session: {session_id[:20]}...")
+
+        route = router.route(user_message, payload.get("model_tier"))
+        if _answer_cache_enabled(payload):
+            entry = _serve_cached(payload, route)
+            if entry is not None:
+                return _cached_response(session_id, entry, route)
         
-        # Process with Strands agent - AgentCore handles memory via runtimeSessionId
-        result = agent(user_message)
-        
-        return {
-            "response": {
-                "role": "assistant",
-                "content": [{"text": result.message}]
-            },
-            "session_id": session_id,
-            "status": "success"
-        }
+        # Process with this session's Strands agent; turns of one session run in order. The agent
+        # is checked out before the global slot, so turns waiting on their own session hold no slot
+        with agent_pool.session(session_id) as agent, admission.slot(_admission_key(payload)) as queue_ms:
+            # The session's agent is checked out exclusively, so switching its model only affects this turn
+            first_turn = not agent.messages
+            agent.model = router.model_for(route)
+            turn_start = time.perf_counter()
+            with trace_turn(session_id) as trace, prefetcher.turn(user_message, _prefetch_enabled(payload, route)):
+                result = agent(user_message)
+            if first_turn and _answer_cache_enabled(payload):
+                _remember_answer(payload, route, result)
+            route_info = router.record(route, (time.perf_counter() - turn_start) * 1000)
         
+        response = _success_response(session_id, result.message, _log_usage(session_id, turn_usage(result)))
+        response["route"] = route_info
+        if payload.get("include_timings"):
+            # Per-phase breakdown: summed duration and call count per span kind
+            response["timings"] = {**trace.phase_timings(), "queue_ms": round(queue_ms, 1)}
+        return response
+
+    except Busy as e:
+        logger.warning(f"Rejected turn for session {payload.get('session_id', 'unknown')[:20]}: {e}")
+        return _busy_response(payload.get("session_id", "unknown"), e)
+
     except Exception as e:
         logger.error(f"Error processing message: {e}")
         return {
@@ -66,6 +513,61 @@ def invoke(payload: Dict[str, Any]) -> Dict[str, Any]:
             "status": "error"
         }
 
+def _warm_model(model: Any) -> None:
+    """Resolve credentials and open the bedrock-runtime connection with a free CountTokens call"""
+    if not hasattr(model, "client"):
+        return
+    try:
+        model.client.count_tokens(
+            modelId=model.config["model_id"],
+            input={"converse": {"messages": [{"role": "user", "content": [{"text": "ping"}]}]}}
+        )
+    except model.client.exceptions.ClientError as e:
+        # Not every model or inference profile supports CountTokens; the connection is warm regardless
+        logger.info(f"Model warm-up call rejected ({e.response['Error']['Code']}), connection is open")
+
+
+def _warm_knowledge_base() -> None:
+    """Load the local snapshot, create the pooled bedrock-agent-runtime client and open its connection"""
+    local_index = get_local_index()
+    if local_index is not None:
+        local_index.refresh(force=True)
+    if os.getenv("KNOWLEDGE_BASE_ID"):
+        # Straight to the client so the warm-up query never lands in the result cache
+        get_client("bedrock-agent-runtime").retrieve(
+            knowledgeBaseId=os.environ["KNOWLEDGE_BASE_ID"],
+            retrievalQuery={"text": "warm-up"},
+            retrievalConfiguration={"vectorSearchConfiguration": {"numberOfResults": 1}}
+        )
+
+
+def _warm_web_search() -> None:
+    if os.getenv("TAVILY_API_KEY"):
+        warm_connection(use_async=web_tool is web_search_async)
+
+
+def prewarm() -> None:
+    """
+    Do the first request's setup work before the server starts: until app.run()
+    binds the port /ping does not answer, so the runtime only routes traffic to a
+    warm container. Disable with STARTUP_PREWARM=false.
+    """
+    if os.getenv("STARTUP_PREWARM", "true").lower() != "true":
+        return
+    # One step per distinct model; tiers sharing a model id share its client
+    distinct = {id(m): (tier, m) for tier, m in reversed(list(tier_models.items()))}
+    startup.prewarm({
+        **{f"model_{tier}": partial(_warm_model, m) for tier, m in distinct.values()},
+        "knowledge_base": _warm_knowledge_base,
+        "web_search": _warm_web_search,
+        # Tool spec validation and registry setup that otherwise lands on the first session
+        "agent": build_agent,
+    })
+
+
 if __name__ == "__main__":
     logger.info("Starting Strands AgentCore App with native memory management...")
-    app.run()
+    prewarm()
+    startup.ready()
+    # serve.py runs several of these on private ports behind one front end
+    app.run(port=int(os.getenv("AGENT_PORT", "8080")), host=os.getenv("AGENT_HOST") or None)
@@ -0,0 +1,97 @@
+"""
+Whole-answer cache for first-turn prompts: a repeated opening question is
+answered without running the agent loop
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import hashlib
+import inspect
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from tool_cache import TTLCache, normalize_query
+from disk_cache import shared_disk_cache
+from observability import record_span
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(system_prompt: Any, tools: Iterable[Any], extra: str = "") -> str:
+    """
+    Version of everything besides the prompt and model that shapes an answer:
+    the system prompt, each tool's spec and the source of the module defining it.
+    Any change gives new cache keys, so answers from older code are never served.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(json.dumps(system_prompt, sort_keys=True, default=str).encode())
+    for tool in tools:
+        digest.update(json.dumps(tool.tool_spec, sort_keys=True, default=str).encode())
+        function = getattr(tool, "_tool_func", tool)
+        try:
+            digest.update(inspect.getsource(sys.modules[function.__module__]).encode())
+        except (KeyError, OSError, TypeError):
+            digest.update(getattr(function, "__qualname__", repr(function)).encode())
+    digest.update(extra.encode())
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """
+    Final answers of first turns, keyed on the normalized prompt, the model
+    tier and model id, and the fingerprint of the system prompt and tools.
+
+    Only first turns are cached and served: a turn with any session history
+    may depend on it. Entries expire after ttl seconds (ANSWER_CACHE_TTL),
+    are shared across worker processes through the disk cache when
+    TOOL_CACHE_DISK_PATH is set, and are dropped whenever the knowledge base
+    cache is invalidated. The caller may give an answer a shorter TTL, e.g.
+    that of the web results it was built from.
+
+    Args:
+        version: fingerprint() of the system prompt and tools
+        ttl: Seconds an answer is served; 0 disables the cache
+    """
+
+    def __init__(self, version: str, ttl: Optional[float] = None):
+        self.version = version
+        ttl = ttl if ttl is not None else float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+        self.cache = TTLCache('answers', ttl=ttl, disk=shared_disk_cache())
+
+    def key(self, prompt: str, tier: str, model_id: Optional[str]) -> str:
+        raw = f"{self.version}|{tier}|{model_id}|{normalize_query(prompt)}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def get(self, prompt: str, tier: str, model_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        entry = self.cache.get(self.key(prompt, tier, model_id))
+        if entry is not None:
+            record_span("cache", "answer", 0.0, hit=True)
+            logger.info(f"Answer cache hit for: {prompt[:60]}")
+        return entry
+
+    def set(self, prompt: str, tier: str, model_id: Optional[str], message: Dict[str, Any],
+            tool_calls: int, ttl: Optional[float] = None) -> None:
+        """Cache an answer for the cache's TTL, or for ttl seconds when that is shorter"""
+        self.cache.set(self.key(prompt, tier, model_id),
+                       {"message": message, "tool_calls": tool_calls, "cached_at": time.time()}, ttl=ttl)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+def cached_exchange(prompt: str, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The user and assistant messages a cache hit adds to the session's history"""
+    # A copy, since the conversation manager may rewrite messages in place
+    return [{"role": "user", "content": [{"text": prompt}]}, copy.deepcopy(entry["message"])]
+
+
+def cache_metadata(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Response metadata marking an answer as served from the cache"""
+    return {"hit": True, "age_s": round(time.time() - entry["cached_at"], 1),
+            "original_tool_calls": entry["tool_calls"]}
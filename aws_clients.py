@@ -0,0 +1,83 @@
+"""
+Shared, long-lived AWS clients for the agent tools
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from observability import instrument_client
+
+logger = logging.getLogger(__name__)
+
+# Clients are keyed by (service, profile, region) and built once per process.
+# botocore clients are thread-safe, so every session and tool call shares them
+# and reuses their warm connection pool instead of paying for credential
+# resolution, endpoint loading and a TLS handshake on each call.
+_clients: Dict[Tuple[str, Optional[str], str], Any] = {}
+_lock = threading.Lock()
+
+
+def client_config() -> Config:
+    """Build the botocore config shared by all pooled clients"""
+    return Config(
+        max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '50')),
+        tcp_keepalive=os.getenv('AWS_TCP_KEEPALIVE', 'true').lower() == 'true',
+        connect_timeout=float(os.getenv('AWS_CONNECT_TIMEOUT', '5')),
+        read_timeout=float(os.getenv('AWS_READ_TIMEOUT', '60')),
+        retries={
+            'mode': os.getenv('AWS_RETRY_MODE', 'standard'),
+            'max_attempts': int(os.getenv('AWS_MAX_ATTEMPTS', '3'))
+        }
+    )
+
+
+def _client_key(service_name: str, profile_name: Optional[str], region_name: Optional[str]):
+    profile = profile_name if profile_name is not None else (os.getenv('AWS_PROFILE') or None)
+    region = region_name or os.getenv('AWS_REGION', 'us-east-1')
+    return service_name, profile, region
+
+
+def get_client(service_name: str, profile_name: Optional[str] = None, region_name: Optional[str] = None) -> Any:
+    """
+    Return the pooled client for a service, building it on first use.
+
+    Args:
+        service_name: botocore service name, e.g. 'bedrock-agent-runtime'
+        profile_name: AWS profile, defaults to AWS_PROFILE
+        region_name: AWS region, defaults to AWS_REGION
+
+    Returns:
+        A thread-safe botocore client shared by all callers
+    """
+    key = _client_key(service_name, profile_name, region_name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            service, profile, region = key
+            logger.info(f"Creating pooled {service} client (profile={profile or 'default'}, region={region})")
+            # boto3 sessions are not thread-safe, so build under the lock
+            session = boto3.Session(profile_name=profile)
+            client = instrument_client(session.client(service, region_name=region, config=client_config()))
+            _clients[key] = client
+    return client
+
+
+def register_client(service_name: str, client: Any, profile_name: Optional[str] = None,
+                    region_name: Optional[str] = None) -> None:
+    """Install a pre-built (or stub) client for a service, e.g. for benchmarks"""
+    with _lock:
+        _clients[_client_key(service_name, profile_name, region_name)] = client
+
+
+def reset_clients() -> None:
+    """Drop all pooled clients so the next call rebuilds them"""
+    with _lock:
+        _clients.clear()
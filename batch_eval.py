@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Batch evaluation: run a JSONL prompt corpus through invoke() and record every turn
+
+Each input line is a JSON object with a "prompt" and optionally "id",
+"session_id", "user_id" and "model_tier". Items run on --workers concurrent
+callers, started at most --rate per second, and each result is appended to
+--output as one JSON line with the response, status, latency, time to first
+token, tool calls and token usage.
+
+Results are written in input order, so the output file is its own checkpoint:
+rerunning the same command after an interruption continues after the last
+written item. The corpus is streamed and at most a fixed window of items is
+in memory, whatever the size of the corpus.
+
+Items without a session_id run in a fresh session each. Items that share a
+session_id form one conversation, run in file order. Session ids are
+prefixed with the run id, so reruns never see an earlier run's memory.
+
+Session history lives in the agent process, so a resumed run starts every
+conversation empty. Before the first resumed turn of a conversation that
+was already under way, its written prompts are replayed (not recorded) to
+rebuild the history. With --no-replay, or when a replayed turn fails, the
+turn runs without its history and its result has "resumed_without_history".
+
+    python batch_eval.py --input regression.jsonl --output results.jsonl --workers 8 --rate 5
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Item fields passed through to invoke() unchanged
+PAYLOAD_FIELDS = ("user_id", "model_tier", "prefetch")
+
+
+def read_items(path: str, after_line: int) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """(line number, item, parse error) for each non-blank line after after_line, read lazily"""
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if line_no <= after_line or not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict) or not item.get("prompt"):
+                    raise ValueError("expected an object with a prompt")
+                yield line_no, item, None
+            except ValueError as e:
+                yield line_no, None, str(e)
+
+
+def session_key(run_id: str, line_no: int, item: Dict[str, Any]) -> str:
+    """
+    Agent session id of an item: its conversation's, or one of its own when it
+    has no session_id. The two get different prefixes, so a line's own session
+    never matches a conversation, however the corpus names its sessions.
+    """
+    own = f"conv-{item['session_id']}" if item.get("session_id") else f"line-{line_no}"
+    # AgentCore runtime session ids must be at least 33 characters
+    return f"batch-{run_id}-{own}".ljust(33, "-")
+
+
+def resume_point(path: str) -> Tuple[int, Optional[str]]:
+    """
+    Input line and run id of the last result in an existing output file.
+
+    A line cut off by an interruption is truncated away first, so its item runs again.
+    """
+    if not os.path.exists(path):
+        return 0, None
+    last = None
+    end = 0
+    with open(path, "rb+") as f:
+        for line in iter(f.readline, b""):
+            if not line.endswith(b"\n"):
+                break
+            end += len(line)
+            if line.strip():
+                last = line
+        f.truncate(end)
+    if last is None:
+        return 0, None
+    record = json.loads(last)
+    return record["line"], record.get("run_id")
+
+
+def open_sessions(input_path: str, output_path: str, start_after: int, run_id: str) -> Dict[str, List[str]]:
+    """
+    Written prompts of each conversation that continues after start_after, in order.
+
+    Only conversations with a turn left to run are kept, so memory follows
+    the conversations open at the resume line rather than the output size.
+    """
+    if not start_after:
+        return {}
+    continuing = {session_key(run_id, line_no, item) for line_no, item, _ in read_items(input_path, start_after)
+                  if item is not None and item.get("session_id")}
+    history: Dict[str, List[str]] = {}
+    if continuing:
+        with open(output_path) as f:
+            for line in f:
+                record = json.loads(line) if line.strip() else {}
+                if record.get("session_id") in continuing:
+                    history.setdefault(record["session_id"], []).append(record["prompt"])
+    return history
+
+
+def response_text(response: Dict[str, Any]) -> str:
+    """Plain text of an invoke() response body"""
+    text = []
+    for block in response.get("content", []):
+        message = block.get("text")
+        # The body wraps the agent's message, which holds the text blocks
+        if isinstance(message, dict):
+            text.extend(b.get("text", "") for b in message.get("content", []))
+        elif message:
+            text.append(message)
+    return "".join(text)
+
+
+class RateLimiter:
+    """Spaces item starts at least 1/rate seconds apart; rate 0 means unlimited"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class OrderedWriter:
+    """
+    Appends results in input order as they complete.
+
+    A result that finishes early waits in a buffer for the ones before it;
+    each write releases a slot of the window, which bounds how many items
+    are read, running or buffered at once.
+    """
+
+    def __init__(self, path: str, window: asyncio.Semaphore):
+        self.file = open(path, "a")
+        self.window = window
+        self.pending: Dict[int, Dict[str, Any]] = {}
+        self.next_seq = 0
+        self.written = 0
+        self.statuses: Dict[str, int] = {}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.tool_calls = 0
+
+    def put(self, seq: int, record: Dict[str, Any]) -> None:
+        self.pending[seq] = record
+        while self.next_seq in self.pending:
+            record = self.pending.pop(self.next_seq)
+            # One write and a flush per record, so an interruption loses at most the line in progress
+            self.file.write(json.dumps(record, default=str) + "\n")
+            self.file.flush()
+            self.next_seq += 1
+            self.written += 1
+            self.statuses[record["status"]] = self.statuses.get(record["status"], 0) + 1
+            self.latency_total += record.get("latency_ms") or 0.0
+            self.latency_max = max(self.latency_max, record.get("latency_ms") or 0.0)
+            self.tool_calls += record.get("tool_calls") or 0
+            self.window.release()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def run_item(invoke: Any, payload: Dict[str, Any], max_retries: int) -> Dict[str, Any]:
+    """One turn over the streaming path; busy rejections are retried after the suggested delay"""
+    for attempt in range(1, max_retries + 2):
+        result: Dict[str, Any] = {"status": None, "tools": [], "attempts": attempt}
+        start = time.perf_counter()
+        try:
+            async for event in invoke(dict(payload, stream=True)):
+                kind = event.get("type")
+                if kind == "text" and "ttft_ms" not in result:
+                    result["ttft_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                elif kind == "tool_start":
+                    result["tools"].append(event["tool"])
+                elif kind == "final":
+                    result.update(status=event["status"], response=response_text(event["response"]),
+                                  usage=event.get("usage"), route=event.get("route"),
+                                  tool_calls=event["summary"]["tool_calls"])
+                elif kind in ("busy", "error"):
+                    result.update(status=event["status"], error=event.get("error"),
+                                  retry_after_ms=event.get("retry_after_ms"))
+        except Exception as e:
+            result.update(status="exception", error=str(e))
+        result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        if result["status"] != "busy" or attempt > max_retries:
+            result.pop("retry_after_ms", None)
+            return result
+        await asyncio.sleep((result.get("retry_after_ms") or 1000) / 1000)
+    return result
+
+
+async def replay(invoke: Any, payload: Dict[str, Any], prompts: List[str], limiter: RateLimiter,
+                 max_retries: int) -> bool:
+    """Rerun a resumed conversation's earlier turns in its session; False once one fails"""
+    for prompt in prompts:
+        await limiter.wait()
+        result = await run_item(invoke, dict(payload, prompt=prompt), max_retries)
+        if result["status"] != "success":
+            return False
+    return True
+
+
+async def run_batch(args: argparse.Namespace, start_after: int, run_id: str,
+                    history: Dict[str, List[str]]) -> OrderedWriter:
+    from agent import invoke
+
+    window = asyncio.Semaphore(args.workers * 4)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.workers)
+    writer = OrderedWriter(args.output, window)
+    limiter = RateLimiter(args.rate)
+    # Completion of the latest queued turn of each session still in flight
+    session_tail: Dict[str, asyncio.Event] = {}
+
+    async def produce() -> None:
+        seq = 0
+        for line_no, item, error in read_items(args.input, start_after):
+            await window.acquire()
+            await queue.put((seq, line_no, item, error))
+            seq += 1
+            if args.limit and seq >= args.limit:
+                break
+        for _ in range(args.workers):
+            await queue.put(None)
+
+    async def work() -> None:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            seq, line_no, item, error = entry
+            if item is None:
+                writer.put(seq, {"line": line_no, "run_id": run_id, "status": "invalid", "error": error})
+                continue
+
+            item_id = item.get("id", line_no)
+            session_id = session_key(run_id, line_no, item)
+            # Chain this turn behind the previous one of its session; the queue hands out items
+            # in file order, so the previous turn is already running on another worker
+            previous = session_tail.get(session_id)
+            done = session_tail[session_id] = asyncio.Event()
+            if previous is not None:
+                await previous.wait()
+
+            payload = {"prompt": item["prompt"], "session_id": session_id,
+                       **{field: item[field] for field in PAYLOAD_FIELDS if field in item}}
+            # The first resumed turn of a conversation rebuilds its history first
+            prompts = history.pop(session_id, None)
+            replayed = prompts is None or (not args.no_replay and
+                                           await replay(invoke, payload, prompts, limiter, args.max_retries))
+            await limiter.wait()
+            result = await run_item(invoke, payload, args.max_retries)
+            if not replayed:
+                result["resumed_without_history"] = True
+
+            done.set()
+            if session_tail.get(session_id) is done:
+                del session_tail[session_id]
+            writer.put(seq, {"id": item_id, "line": line_no, "run_id": run_id, "session_id": session_id,
+                             "prompt": item["prompt"], **result})
+
+    try:
+        await asyncio.gather(produce(), *(work() for _ in range(args.workers)))
+    finally:
+        writer.close()
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', required=True, help='prompt corpus, one JSON object per line')
+    parser.add_argument('--output', required=True, help='results JSONL; an existing file is resumed')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent turns')
+    parser.add_argument('--rate', type=float, default=0, help='max items started per second (0 = unlimited)')
+    parser.add_argument('--max-retries', type=int, default=3, help='retries of a turn rejected as busy')
+    parser.add_argument('--limit', type=int, default=0, help='stop after this many items (0 = all)')
+    parser.add_argument('--restart', action='store_true', help='discard an existing output file instead of resuming')
+    parser.add_argument('--no-replay', action='store_true',
+                        help='resume open conversations without replaying their earlier turns')
+    parser.add_argument('--stub', action='store_true', help='use the offline stub backends from stubs.py')
+    parser.add_argument('--verbose', action='store_true', help='keep the agent\'s logging')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Per-turn logs from the agent would drown the progress report
+        logging.disable(logging.WARNING)
+
+    if args.stub:
+        os.environ["AGENT_STUB_BACKENDS"] = "true"
+        # Resolve credentials from the environment instead of probing IMDS
+        os.environ.pop('AWS_PROFILE', None)
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'batch-eval')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'batch-eval')
+
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    start_after, run_id = resume_point(args.output)
+    run_id = run_id or datetime.now().strftime('%Y%m%d%H%M%S')
+    history = open_sessions(args.input, args.output, start_after, run_id)
+
+    print("🧪 Batch evaluation")
+    print("=" * 60)
+    print(f"Input: {args.input}   Output: {args.output}   Run: {run_id}")
+    print(f"Workers: {args.workers}   Rate: {args.rate or 'unlimited'}   Backends: {'stub' if args.stub else 'live'}")
+    if start_after:
+        print(f"Resuming after input line {start_after}")
+    if history:
+        print(f"{'Skipping replay of' if args.no_replay else 'Replaying'} {sum(map(len, history.values()))} "
+              f"earlier turns of {len(history)} open conversations")
+    print()
+
+    start = time.perf_counter()
+    try:
+        writer = asyncio.run(run_batch(args, start_after, run_id, history))
+    except KeyboardInterrupt:
+        print("⏸️  Interrupted; rerun the same command to resume")
+        sys.exit(130)
+    elapsed = time.perf_counter() - start
+
+    print(f"Items: {writer.written}   " + "   ".join(f"{s}: {n}" for s, n in sorted(writer.statuses.items())))
+    if writer.written:
+        print(f"Latency: mean {writer.latency_total / writer.written:.1f} ms, max {writer.latency_max:.1f} ms   "
+              f"Tool calls: {writer.tool_calls}   Throughput: {writer.written / elapsed:.2f} items/s")
+    print(f"💾 Results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
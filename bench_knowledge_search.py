@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for knowledge_search
+
+Client overhead: compares building a fresh boto3 Session + bedrock-agent-runtime
+client on every call (the old behaviour) against the pooled client registry.
+Offline by default: dummy credentials are used and only client setup is timed.
+Pass --live to time real retrieve calls against KNOWLEDGE_BASE_ID, which also
+includes the TLS handshake saved by connection reuse.
+
+Search modes (--modes): times knowledge_search end to end in 'retrieve' and
+'generate' mode. Offline it runs against a stub client whose latencies are set
+with --retrieve-ms/--generate-ms; with --live it calls the real knowledge base.
+
+Batching (--batch): three rephrased queries as three sequential tool calls
+versus one knowledge_search call with all three in queries.
+
+Local index (--local): retrieve calls against the remote (stub) knowledge base
+versus a local snapshot (KB_LOCAL_INDEX) with stub query embeddings, plus the
+in-process top-k search time over a synthetic --local-chunks x 1024 matrix.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from dotenv import load_dotenv
+
+import boto3
+import aws_clients
+from stubs import StubEmbeddingClient, StubKnowledgeBaseClient
+
+# Load environment variables
+load_dotenv()
+
+SERVICE = 'bedrock-agent-runtime'
+
+
+def per_call_client():
+    """Old behaviour: new session and client for every tool call"""
+    session = boto3.Session(profile_name=os.getenv('AWS_PROFILE') or None)
+    return session.client(SERVICE, region_name=os.getenv('AWS_REGION', 'us-east-1'))
+
+
+def pooled_client():
+    """New behaviour: shared client from the registry"""
+    return aws_clients.get_client(SERVICE)
+
+
+def live_call(client):
+    """Issue one real retrieve call so connection setup is included"""
+    client.retrieve(
+        knowledgeBaseId=os.getenv('KNOWLEDGE_BASE_ID'),
+        retrievalQuery={'text': 'benchmark'},
+        retrievalConfiguration={'vectorSearchConfiguration': {'numberOfResults': 1}}
+    )
+
+
+def measure(name, get_client, iterations, live):
+    """Time get_client (and optionally a live call) over N iterations"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        client = get_client()
+        if live:
+            live_call(client)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    print(f"{name:<18} mean {statistics.mean(timings):8.3f} ms   "
+          f"p50 {timings[len(timings) // 2]:8.3f} ms   "
+          f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:8.3f} ms")
+    return statistics.mean(timings)
+
+
+def measure_modes(iterations):
+    """Time the tool end to end in each search mode"""
+    from knowledge_base_tool import knowledge_search, kb_cache
+
+    # Measure the backend, not the result cache
+    kb_cache.ttl = 0
+    results = {}
+    for mode in ('retrieve', 'generate'):
+        os.environ['KB_SEARCH_MODE'] = mode
+        results[mode] = measure(f"mode={mode}", lambda: asyncio.run(knowledge_search("What is our PTO policy?")),
+                                iterations, live=False)
+    return results
+
+
+BATCH_QUERIES = ["What is our PTO policy?", "paid time off accrual", "vacation days rollover rules"]
+
+
+def measure_batch(iterations):
+    """Time rephrased queries as sequential tool calls versus one multi-query call"""
+    from knowledge_base_tool import knowledge_search, kb_cache
+
+    kb_cache.ttl = 0
+    os.environ['KB_SEARCH_MODE'] = 'retrieve'
+
+    async def sequential():
+        for query in BATCH_QUERIES:
+            await knowledge_search(query)
+
+    before = measure("3 calls", lambda: asyncio.run(sequential()), iterations, live=False)
+    after = measure("1 batched call", lambda: asyncio.run(knowledge_search(queries=BATCH_QUERIES)),
+                    iterations, live=False)
+    return before, after
+
+
+def measure_local(iterations, chunks, embed_ms):
+    """Time retrieve_chunks remote versus from a local snapshot, and raw local search"""
+    import numpy as np
+    import knowledge_base_tool
+    from knowledge_base_tool import retrieve_chunks, kb_cache
+    from local_kb_index import Snapshot, write_snapshot
+    from build_kb_snapshot import embed_chunks, stub_chunks
+
+    kb_cache.ttl = 0
+    aws_clients.register_client('bedrock-runtime', StubEmbeddingClient(latency=embed_ms / 1000))
+    remote = measure("remote retrieve", lambda: retrieve_chunks("What is our PTO policy?"), iterations, live=False)
+
+    with tempfile.TemporaryDirectory() as root:
+        write_snapshot(root, stub_chunks(), embed_chunks(stub_chunks(), 'stub', 1024, 1), {'knowledge_base_id': None})
+        os.environ['KB_LOCAL_INDEX'] = root
+        knowledge_base_tool._local_index = None
+        local = measure("local snapshot", lambda: retrieve_chunks("What is our PTO policy?"), iterations, live=False)
+
+        rng = np.random.default_rng(0)
+        matrix = rng.standard_normal((chunks, 1024), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        path = write_snapshot(root, [{'text': str(i)} for i in range(chunks)], matrix, {})
+        snapshot = Snapshot(path)
+        query = matrix[0]
+        measure(f"top-5 of {chunks}", lambda: snapshot.search(query, 5), iterations, live=False)
+    return remote, local
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--live', action='store_true', help='time real retrieve calls (needs AWS access)')
+    parser.add_argument('--modes', action='store_true', help='compare retrieve vs generate search modes')
+    parser.add_argument('--batch', action='store_true', help='compare sequential vs multi-query knowledge_search')
+    parser.add_argument('--local', action='store_true', help='compare remote retrieve vs a local snapshot index')
+    parser.add_argument('--local-chunks', type=int, default=100000, help='synthetic chunk count for local search')
+    parser.add_argument('--embed-ms', type=float, default=20, help='stub query embedding latency')
+    parser.add_argument('--retrieve-ms', type=float, default=150, help='stub retrieve latency')
+    parser.add_argument('--generate-ms', type=float, default=1500, help='stub generation latency')
+    args = parser.parse_args()
+
+    if args.live and not os.getenv('KNOWLEDGE_BASE_ID'):
+        print("❌ Error: KNOWLEDGE_BASE_ID must be set for --live")
+        sys.exit(1)
+
+    if not args.live:
+        # Resolve credentials from the environment instead of probing IMDS
+        os.environ.pop('AWS_PROFILE', None)
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+    if args.local:
+        aws_clients.register_client(SERVICE, StubKnowledgeBaseClient(retrieve_latency=args.retrieve_ms / 1000))
+        print("⏱️  knowledge_search: remote knowledge base vs local snapshot")
+        print("=" * 60)
+        print(f"Iterations: {args.iterations}   Backend: stub")
+        print()
+        remote, local = measure_local(args.iterations, args.local_chunks, args.embed_ms)
+        print()
+        print(f"📉 Local snapshot saves {remote - local:.1f} ms per lookup")
+        return
+
+    if args.modes or args.batch:
+        if not args.live:
+            aws_clients.register_client(SERVICE, StubKnowledgeBaseClient(
+                retrieve_latency=args.retrieve_ms / 1000,
+                generate_latency=args.generate_ms / 1000
+            ))
+        if args.batch:
+            print("⏱️  knowledge_search: sequential vs batched queries")
+            print("=" * 60)
+            print(f"Iterations: {args.iterations}   Backend: {'live' if args.live else 'stub'}")
+            print()
+            before, after = measure_batch(args.iterations)
+            print()
+            print(f"📉 Batching saves {before - after:.1f} ms per three-query lookup")
+            return
+
+        print("⏱️  knowledge_search latency by search mode")
+        print("=" * 60)
+        print(f"Iterations: {args.iterations}   Backend: {'live' if args.live else 'stub'}")
+        print()
+        results = measure_modes(args.iterations)
+        print()
+        print(f"📉 Retrieve-only saves {results['generate'] - results['retrieve']:.1f} ms per call")
+        return
+
+    print("⏱️  knowledge_search client overhead")
+    print("=" * 60)
+    print(f"Iterations: {args.iterations}   Mode: {'live' if args.live else 'offline'}")
+    print()
+
+    before = measure("per-call client", per_call_client, args.iterations, args.live)
+    aws_clients.reset_clients()
+    after = measure("pooled client", pooled_client, args.iterations, args.live)
+
+    print()
+    print(f"📉 Overhead saved per call: {before - after:.3f} ms ({before / max(after, 1e-6):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for multi-process serving
+
+Starts serve.py with each worker count in --workers, drives the same HTTP
+load at it with the load_test.py harness, and prints throughput and latency
+per worker count. Offline with stub backends; --model-ms and --token-ms set
+the stub model's latencies. With little stub latency every turn is mostly
+the agent's own Python work, so the run shows how that work spreads across
+processes; one process is limited to one core by the GIL.
+
+Scaling stops at the machine's core count: on a 2-core host 4 workers run
+no faster than 2.
+"""
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import logging
+import subprocess
+import tempfile
+from dotenv import load_dotenv
+
+import requests
+from load_test import DEFAULT_PROMPTS, HttpTarget, run_load, summarize
+
+# Load environment variables
+load_dotenv()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, args: argparse.Namespace, cache_path: str) -> tuple:
+    """serve.py with stub backends on free ports; returns (process, url) once /ping answers"""
+    port = free_port()
+    env = dict(os.environ, SERVE_WORKERS=str(workers), AGENT_PORT=str(port),
+               SERVE_WORKER_BASE_PORT=str(free_port()), AGENT_HOST="127.0.0.1",
+               AGENT_STUB_BACKENDS="true", STUB_MODEL_TTFT_MS=str(args.model_ms),
+               STUB_MODEL_TOKEN_MS=str(args.token_ms), TOOL_CACHE_DISK_PATH=cache_path,
+               AWS_ACCESS_KEY_ID="bench", AWS_SECRET_ACCESS_KEY="bench")
+    env.pop("AWS_PROFILE", None)
+    server = subprocess.Popen([sys.executable, "serve.py"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"serve.py exited with code {server.returncode}")
+        try:
+            if requests.get(url + "/ping", timeout=1).ok:
+                return server, url
+        except requests.RequestException:
+            time.sleep(0.25)
+    server.terminate()
+    raise RuntimeError("serve.py did not become healthy within 120s")
+
+
+async def measure(url: str, args: argparse.Namespace) -> dict:
+    target = HttpTarget(url, args.concurrency)
+    try:
+        if args.warmup:
+            await run_load(target, argparse.Namespace(**{**vars(args), "requests": args.warmup}), DEFAULT_PROMPTS)
+        start = time.perf_counter()
+        samples = await run_load(target, args, DEFAULT_PROMPTS)
+        return summarize(samples, time.perf_counter() - start)
+    finally:
+        await target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated worker counts to compare')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=32, help='requests run before measuring each setting')
+    parser.add_argument('--sessions', type=int, default=64, help='distinct session ids (turns reuse them)')
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--model-ms', type=float, default=20, help='stub model time to first token')
+    parser.add_argument('--token-ms', type=float, default=0, help='stub model latency per streamed token')
+    parser.add_argument('--no-stream', dest='stream', action='store_false', help='use the JSON response path')
+    args = parser.parse_args()
+    args.prefetch = False
+    counts = [int(n) for n in args.workers.split(',')]
+
+    logging.disable(logging.WARNING)
+    print("🚀 Multi-process serving throughput")
+    print("=" * 60)
+    print(f"Workers: {counts}   CPUs: {os.cpu_count()}   Concurrency: {args.concurrency}   "
+          f"Requests: {args.requests}")
+    print()
+
+    results = {}
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            server, url = start_server(workers, args, os.path.join(tmp, "tool-cache.db"))
+            try:
+                results[workers] = asyncio.run(measure(url, args))
+            finally:
+                server.terminate()
+                server.wait()
+        summary = results[workers]
+        print(f"{workers:>2} workers: {summary['rps']:>8.2f} req/s   p50 {summary['latency_ms']['p50']} ms   "
+              f"p95 {summary['latency_ms']['p95']} ms   errors {summary['errors']}   busy {summary['busy']}")
+
+    base = results[counts[0]]["rps"]
+    print()
+    for workers in counts[1:]:
+        print(f"📈 {workers} workers: {results[workers]['rps'] / max(base, 1e-6):.2f}x the throughput of {counts[0]}")
+
+
+if __name__ == "__main__":
+    main()
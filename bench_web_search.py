@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark for web_search connection reuse
+
+Runs web_search against a local stand-in for the Tavily API and reports TCP
+connections opened and p50/p99 latency at several caller concurrencies for:
+
+  per-call   requests.post with no session (the old behaviour)
+  pooled     the shared keep-alive requests session (web_search)
+  async      the asyncio-native aiohttp client (web_search_async)
+"""
+
+import os
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import web_search_tool
+from web_search_tool import web_search, web_search_async
+from stubs import StubTavilyServer
+
+
+def per_call_search(query):
+    """Old behaviour: a new connection for every query"""
+    response = requests.post(os.environ['TAVILY_API_URL'], json={"query": query}, timeout=10)
+    response.raise_for_status()
+    return web_search_tool.format_results(response.json())
+
+
+def timed(fn, query):
+    start = time.perf_counter()
+    fn(query)
+    return (time.perf_counter() - start) * 1000
+
+
+def run_threads(fn, concurrency, total):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda i: timed(fn, f"query {i}"), range(total)))
+
+
+async def run_async(concurrency, total):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await web_search_async(f"query {i}")
+            return (time.perf_counter() - start) * 1000
+
+    return await asyncio.gather(*(one(i) for i in range(total)))
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64])
+    parser.add_argument('--requests', type=int, default=256, help='requests per run')
+    parser.add_argument('--latency-ms', type=float, default=20, help='stub server latency')
+    args = parser.parse_args()
+
+    server = StubTavilyServer(latency=args.latency_ms / 1000).start()
+    os.environ['TAVILY_API_URL'] = server.url
+    os.environ['TAVILY_API_KEY'] = 'benchmark'
+    os.environ['WEB_SEARCH_POOL_SIZE'] = str(max(args.concurrency))
+    # Measure connections, not the result cache
+    web_search_tool.web_cache.ttl = 0
+
+    modes = {
+        'per-call': lambda c: run_threads(per_call_search, c, args.requests),
+        'pooled': lambda c: run_threads(web_search, c, args.requests),
+        'async': lambda c: asyncio.run(run_async(c, args.requests)),
+    }
+
+    print("⏱️  web_search against local Tavily stand-in")
+    print("=" * 70)
+    print(f"Requests per run: {args.requests}   Server latency: {args.latency_ms:.0f} ms")
+    print()
+    print(f"{'mode':<10}{'callers':>8}{'connections':>13}{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+
+    try:
+        for concurrency in args.concurrency:
+            for mode, run in modes.items():
+                web_search_tool.reset_http_clients()
+                opened = server.connections
+
+                start = time.perf_counter()
+                latencies = run(concurrency)
+                elapsed = time.perf_counter() - start
+
+                print(f"{mode:<10}{concurrency:>8}{server.connections - opened:>13}"
+                      f"{percentile(latencies, 50):>10.1f}{percentile(latencies, 99):>10.1f}"
+                      f"{len(latencies) / elapsed:>10.0f}")
+            print()
+    finally:
+        web_search_tool.reset_http_clients()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Build a local knowledge base snapshot for KB_LOCAL_INDEX
+
+Reads chunks exported from the knowledge base's vector store as JSON lines
+({"text", "source", "chunk_id", optional "embedding"}), embeds any chunk
+without an embedding using the knowledge base's embedding model, and writes a
+new snapshot version under the index directory. A running agent picks the
+new version up within KB_LOCAL_CHECK_INTERVAL seconds, without a restart.
+
+Use the same embedding model and dimensions as the knowledge base, so local
+scores rank chunks the way Bedrock would. --stub builds a snapshot of the
+stub knowledge base's chunks with the stub embedder, for offline runs.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+import numpy as np
+import aws_clients
+from local_kb_index import DEFAULT_EMBEDDING_MODEL, embed_text, write_snapshot
+from stubs import SAMPLE_CHUNKS, StubEmbeddingClient
+
+# Load environment variables
+load_dotenv()
+
+
+def read_chunks(path):
+    """Load exported chunks, skipping blank lines and chunks without text"""
+    with open(path) as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+    return [chunk for chunk in chunks if chunk.get('text')]
+
+
+def stub_chunks():
+    """The stub knowledge base's chunks, as StubKnowledgeBaseClient returns them"""
+    return [{'text': text, 'source': f's3://stub-kb/doc-{i}.md', 'chunk_id': f'stub-chunk-{i}'}
+            for i, text in enumerate(SAMPLE_CHUNKS)]
+
+
+def embed_chunks(chunks, model_id, dimensions, workers):
+    """Embedding matrix for the chunks, calling the model only for chunks that lack one"""
+    missing = [i for i, chunk in enumerate(chunks) if not chunk.get('embedding')]
+    vectors = {i: chunk['embedding'] for i, chunk in enumerate(chunks) if chunk.get('embedding')}
+    if missing:
+        print(f"Embedding {len(missing)} of {len(chunks)} chunks with {model_id} ({dimensions} dims)...")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            embedded = executor.map(lambda i: embed_text(chunks[i]['text'], model_id, dimensions), missing)
+            vectors.update(zip(missing, embedded))
+    return np.stack([np.asarray(vectors[i], dtype=np.float32) for i in range(len(chunks))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--input', help='exported chunks, one JSON object per line')
+    parser.add_argument('--index', default=os.getenv('KB_LOCAL_INDEX'), help='snapshot directory (KB_LOCAL_INDEX)')
+    parser.add_argument('--model', default=os.getenv('KB_EMBEDDING_MODEL_ID', DEFAULT_EMBEDDING_MODEL),
+                        help='embedding model for chunks without an embedding')
+    parser.add_argument('--dimensions', type=int, default=1024, help='embedding dimensions')
+    parser.add_argument('--workers', type=int, default=8, help='parallel embedding calls')
+    parser.add_argument('--keep', type=int, default=2, help='snapshot versions to keep')
+    parser.add_argument('--stub', action='store_true', help='snapshot the stub knowledge base offline')
+    args = parser.parse_args()
+
+    if not args.index:
+        print("❌ Error: pass --index or set KB_LOCAL_INDEX")
+        sys.exit(1)
+    if not args.input and not args.stub:
+        print("❌ Error: pass --input (or --stub for an offline snapshot)")
+        sys.exit(1)
+
+    if args.stub:
+        aws_clients.register_client('bedrock-runtime', StubEmbeddingClient(latency=0))
+        chunks = stub_chunks()
+        knowledge_base_id = 'stub-kb'
+    else:
+        chunks = read_chunks(args.input)
+        knowledge_base_id = os.getenv('KNOWLEDGE_BASE_ID')
+        if not chunks:
+            print(f"❌ Error: no chunks with text in {args.input}")
+            sys.exit(1)
+
+    print("📦 Building local knowledge base snapshot")
+    print("=" * 60)
+    start = time.perf_counter()
+    embeddings = embed_chunks(chunks, args.model, args.dimensions, args.workers)
+
+    os.makedirs(args.index, exist_ok=True)
+    path = write_snapshot(args.index, chunks, embeddings, {
+        'knowledge_base_id': knowledge_base_id,
+        'embedding_model': args.model,
+        'source': 'stub' if args.stub else os.path.abspath(args.input)
+    }, keep=args.keep)
+
+    print(f"✅ Snapshot {os.path.basename(path)}: {len(chunks)} chunks, {embeddings.shape[1]} dims, "
+          f"{embeddings.nbytes / 1024:.0f} KiB, built in {time.perf_counter() - start:.1f}s")
+    print(f"   Live for agents with KB_LOCAL_INDEX={args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Query-aware context packing for tool results: BM25 reranking of passages,
+near-duplicate removal, and filling a per-tool token budget
+"""
+
+import os
+import re
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no search intent, ignored when matching queries and passages
+STOPWORDS = frozenset(
+    "a an the is are was were be been am do does did of in on at to for from with by about and or "
+    "what whats which who whom how why when where can could should would will please tell me us our "
+    "my your i we you it its this that these those there any some give find show explain".split()
+)
+_TOKEN = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_lock = threading.Lock()
+_stats = {"packs": 0, "candidates": 0, "packed": 0, "duplicates": 0, "tokens_in": 0, "tokens_out": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def content_terms(text: str) -> List[str]:
+    """Lower-cased words of a text without stopwords, in order and with repeats"""
+    # Terms are runs of word characters, so punctuation needs no normalizing first
+    return [t for t in _TOKEN.findall(text.casefold()) if t not in STOPWORDS]
+
+
+def split_passages(text: str, max_tokens: Optional[int] = None) -> List[str]:
+    """Split text into passages of whole sentences, each at most max_tokens where sentences allow"""
+    max_tokens = max_tokens or int(os.getenv('PACK_PASSAGE_TOKENS', '50'))
+    passages: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for sentence in _SENTENCE_END.split(text.strip()):
+        pieces = [sentence]
+        if estimate_tokens(sentence) > max_tokens:
+            # A run-on "sentence" (tables, lists, scraped text) is cut into word windows
+            words = sentence.split()
+            step = max(1, max_tokens * 4 // 6)
+            pieces = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        for piece in pieces:
+            cost = estimate_tokens(piece)
+            if current and size + cost > max_tokens:
+                passages.append(" ".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += cost
+
+    if current:
+        passages.append(" ".join(current))
+    return [p for p in passages if p]
+
+
+def bm25_scores(query_terms: List[str], passage_terms: List[List[str]],
+                k1: float = 1.2, b: float = 0.75) -> "np.ndarray":
+    """BM25 score of each passage for the query, computed over a passages x query-terms matrix"""
+    import numpy as np
+
+    terms = list(dict.fromkeys(query_terms))
+    if not terms or not passage_terms:
+        return np.zeros(len(passage_terms), dtype=np.float32)
+
+    column = {term: i for i, term in enumerate(terms)}
+    tf = np.zeros((len(passage_terms), len(terms)), dtype=np.float32)
+    for row, words in enumerate(passage_terms):
+        for word in words:
+            if word in column:
+                tf[row, column[word]] += 1
+
+    lengths = np.array([len(words) for words in passage_terms], dtype=np.float32)
+    norm = k1 * (1 - b + b * lengths / (lengths.mean() or 1.0))
+    df = np.count_nonzero(tf, axis=0)
+    # The +1 keeps idf positive when a term appears in most of a small candidate set
+    idf = np.log1p((len(passage_terms) - df + 0.5) / (df + 0.5))
+    return (idf * tf * (k1 + 1) / (tf + norm[:, None])).sum(axis=1)
+
+
+def containment_matrix(passage_terms: List[List[str]]) -> "np.ndarray":
+    """
+    Pairwise overlap of the passages' term sets, relative to the smaller set:
+    1.0 when one passage's terms all appear in the other, e.g. a snippet
+    syndicated from a longer article
+    """
+    import numpy as np
+
+    vocabulary: Dict[str, int] = {}
+    rows = [[vocabulary.setdefault(term, len(vocabulary)) for term in set(words)] for words in passage_terms]
+    presence = np.zeros((len(rows), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, columns in enumerate(rows):
+        presence[row, columns] = 1.0
+
+    overlap = presence @ presence.T
+    sizes = presence.sum(axis=1)
+    smaller = np.minimum(sizes[:, None], sizes[None, :])
+    return np.divide(overlap, smaller, out=np.zeros_like(overlap), where=smaller > 0)
+
+
+def pack(query: str, documents: List[Dict[str, Any]], token_budget: int,
+         overhead: Callable[[Dict[str, Any]], int] = lambda document: 0,
+         require_match: bool = False, prior_weight: Optional[float] = None,
+         dedupe_threshold: Optional[float] = None) -> List[Tuple[Dict[str, Any], List[str]]]:
+    """
+    Choose the passages of documents most relevant to query that fit the budget.
+
+    Every document is split into passages; each passage is scored by BM25
+    against the query, blended with its document's retrieval score (0-1)
+    by prior_weight. Passages are then taken best first, skipping near-
+    duplicates of one already taken (term containment >= dedupe_threshold)
+    and any passage that no longer fits. overhead(document) is charged once
+    for each document that contributes, for its header, title or URL.
+
+    Args:
+        query: Search query (or several, joined) the passages should answer
+        documents: Dicts with 'text' and optionally 'score'
+        token_budget: Estimated tokens the packed passages and overheads may use
+        overhead: Token cost of rendering a document around its passages
+        require_match: Drop passages sharing no term with the query; leave off for
+            semantic retrieval, where a relevant passage may use other words
+
+    Returns:
+        (document, excerpts) pairs, most relevant document first; each excerpt is a
+        run of adjacent passages in their original order
+    """
+    prior_weight = prior_weight if prior_weight is not None else float(os.getenv('PACK_PRIOR_WEIGHT', '0.3'))
+    dedupe_threshold = (dedupe_threshold if dedupe_threshold is not None
+                        else float(os.getenv('PACK_DEDUPE_THRESHOLD', '0.8')))
+
+    candidates = [(d, p, text) for d, document in enumerate(documents)
+                  for p, text in enumerate(split_passages(document.get('text') or ''))]
+    if not candidates or token_budget <= 0:
+        return []
+
+    # numpy is imported on first pack, so modules importing this one load without it
+    import numpy as np
+
+    terms = [content_terms(text) for _, _, text in candidates]
+    query_terms = content_terms(query)
+    relevance = bm25_scores(query_terms, terms)
+    matched = relevance > 0
+    if matched.any():
+        relevance = relevance / relevance.max()
+    # A query of only stopwords has nothing to match against
+    require_match = require_match and bool(query_terms)
+    priors = np.array([min(max(float(documents[d].get('score') or 0), 0.0), 1.0) for d, _, _ in candidates],
+                      dtype=np.float32)
+    # Stable sort, so equally relevant passages keep their retrieval order
+    order = np.argsort(-((1 - prior_weight) * relevance + prior_weight * priors), kind='stable')
+    similar = containment_matrix(terms) >= dedupe_threshold
+
+    remaining = token_budget
+    taken: List[int] = []
+    chosen: Dict[int, List[Tuple[int, str]]] = {}
+    duplicates = 0
+    for i in order:
+        if require_match and not matched[i]:
+            continue
+        if taken and similar[i, taken].any():
+            duplicates += 1
+            continue
+        d, position, text = candidates[i]
+        cost = estimate_tokens(text) + (0 if d in chosen else overhead(documents[d]))
+        if cost > remaining:
+            continue
+        remaining -= cost
+        taken.append(int(i))
+        chosen.setdefault(d, []).append((position, text))
+
+    packed = [(documents[d], _excerpts(sorted(passages))) for d, passages in chosen.items()]
+    tokens_in = sum(estimate_tokens(text) for _, _, text in candidates)
+    with _lock:
+        _stats["packs"] += 1
+        _stats["candidates"] += len(candidates)
+        _stats["packed"] += len(taken)
+        _stats["duplicates"] += duplicates
+        _stats["tokens_in"] += tokens_in
+        _stats["tokens_out"] += token_budget - remaining
+    logger.debug(f"Packed {len(taken)} of {len(candidates)} passages, "
+                 f"{token_budget - remaining} of {tokens_in} tokens")
+    return packed
+
+
+def _excerpts(passages: List[Tuple[int, str]]) -> List[str]:
+    """Join runs of adjacent passages back into continuous text"""
+    runs: List[List[str]] = []
+    previous = None
+    for position, text in passages:
+        if previous is not None and position == previous + 1:
+            runs[-1].append(text)
+        else:
+            runs.append([text])
+        previous = position
+    return [" ".join(run) for run in runs]
+
+
+def join_excerpts(excerpts: List[str]) -> str:
+    """Render a document's excerpts, marking the gaps between them"""
+    return " ... ".join(excerpts)
+
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        return dict(_stats)
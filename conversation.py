@@ -0,0 +1,139 @@
+"""
+Bounded conversation memory: recent turns verbatim, older turns folded into a running summary
+"""
+
+import os
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from strands.agent.conversation_manager import ConversationManager
+from strands.types.exceptions import ContextWindowOverflowException
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_MARKER = "[Summary of earlier conversation]"
+
+
+def _is_turn_start(message: Dict[str, Any]) -> bool:
+    """A turn starts at a user message carrying text rather than tool results"""
+    content = message.get("content", [])
+    return (
+        message.get("role") == "user"
+        and any("text" in block for block in content)
+        and not any("toolResult" in block for block in content)
+    )
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def summarize_turns(messages: List[Dict[str, Any]]) -> List[str]:
+    """
+    Cheap extractive summary: one line per user question and per final assistant
+    answer, plus the tools that were called. No model call is made.
+    """
+    lines = []
+    for message in messages:
+        texts = [block["text"] for block in message.get("content", [])
+                 if "text" in block and not block["text"].startswith(SUMMARY_MARKER)]
+        tools = [block["toolUse"]["name"] for block in message.get("content", []) if "toolUse" in block]
+
+        if message.get("role") == "user" and texts:
+            lines.append(f"- User: {_clip(' '.join(texts), 200)}")
+        elif message.get("role") == "assistant":
+            if tools:
+                lines.append(f"- Assistant used: {', '.join(tools)}")
+            elif texts:
+                lines.append(f"- Assistant: {_clip(' '.join(texts), 300)}")
+    return lines
+
+
+class BoundedConversationManager(ConversationManager):
+    """
+    Keeps the last max_turns turns verbatim and folds everything older into a
+    running summary that rides on the first kept user message. Tool results
+    from earlier turns are replaced by short stubs. Input tokens per turn stop
+    growing once the window is full.
+    """
+
+    def __init__(self, max_turns: Optional[int] = None, max_summary_chars: Optional[int] = None,
+                 max_tool_result_chars: Optional[int] = None,
+                 summarizer: Optional[Callable[[List[Dict[str, Any]]], List[str]]] = None):
+        super().__init__()
+        self.max_turns = max_turns or int(os.getenv('CONVERSATION_MAX_TURNS', '6'))
+        self.max_summary_chars = max_summary_chars or int(os.getenv('CONVERSATION_SUMMARY_CHARS', '2000'))
+        self.max_tool_result_chars = max_tool_result_chars or int(os.getenv('CONVERSATION_TOOL_RESULT_CHARS', '400'))
+        self.summarize = summarizer or summarize_turns
+        self.summary_lines: List[str] = []
+
+    def apply_management(self, agent: Any, **kwargs: Any) -> None:
+        """Called after every invocation: stub old tool output, fold turns past the window"""
+        self._stub_tool_results(agent.messages)
+        self._fold(agent.messages, self.max_turns)
+
+    def reduce_context(self, agent: Any, e: Optional[Exception] = None, **kwargs: Any) -> None:
+        """Context overflow: stub all tool output and keep only the current turn"""
+        self._stub_tool_results(agent.messages, include_current_turn=True)
+        if not self._fold(agent.messages, 1) and e is not None:
+            raise ContextWindowOverflowException("Unable to reduce conversation context") from e
+
+    def _stub_tool_results(self, messages: List[Dict[str, Any]], include_current_turn: bool = False) -> None:
+        starts = [i for i, message in enumerate(messages) if _is_turn_start(message)]
+        end = len(messages) if include_current_turn or not starts else starts[-1]
+
+        for message in messages[:end]:
+            for block in message.get("content", []):
+                if "toolResult" not in block:
+                    continue
+                result = block["toolResult"]
+                text = "\n".join(item["text"] for item in result.get("content", []) if "text" in item)
+                if len(text) > self.max_tool_result_chars:
+                    head = _clip(text, self.max_tool_result_chars // 2)
+                    result["content"] = [{"text": f"[{len(text)} chars of tool output omitted] {head}"}]
+
+    def _fold(self, messages: List[Dict[str, Any]], keep_turns: int) -> bool:
+        """Fold all but the last keep_turns turns into the summary; returns True if anything was folded"""
+        starts = [i for i, message in enumerate(messages) if _is_turn_start(message)]
+        if len(starts) <= keep_turns:
+            return False
+
+        cut = starts[-keep_turns]
+        self.summary_lines.extend(self.summarize(messages[:cut]))
+        # Oldest summary lines go first once the summary outgrows its budget
+        while self.summary_lines and sum(len(line) + 1 for line in self.summary_lines) > self.max_summary_chars:
+            self.summary_lines.pop(0)
+
+        del messages[:cut]
+        self.removed_message_count += cut
+
+        first = messages[0]
+        first["content"] = [block for block in first["content"]
+                            if not block.get("text", "").startswith(SUMMARY_MARKER)]
+        if self.summary_lines:
+            first["content"].insert(0, {"text": f"{SUMMARY_MARKER}\n" + "\n".join(self.summary_lines)})
+
+        logger.debug(f"Folded {cut} messages into conversation summary ({len(self.summary_lines)} lines)")
+        return True
+
+    def get_state(self) -> Dict[str, Any]:
+        state = super().get_state()
+        state["summary_lines"] = self.summary_lines
+        return state
+
+    def restore_from_session(self, state: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        result = super().restore_from_session(state)
+        self.summary_lines = list(state.get("summary_lines", []))
+        return result
+
+
+def turn_usage(result: Any) -> Dict[str, Any]:
+    """Token usage for the turn that produced result (per invocation, not lifetime)"""
+    metrics = result.metrics
+    invocation = getattr(metrics, "latest_agent_invocation", None)
+    usage = dict(invocation.usage if invocation is not None else metrics.accumulated_usage)
+
+    context_size = getattr(result, "context_size", None)
+    if context_size is not None:
+        usage["contextTokens"] = context_size
+    return usage
@@ -0,0 +1,233 @@
+"""
+Persistent tool-result cache shared by every worker process: SQLite in WAL mode
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS generations (
+    namespace TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+);
+"""
+
+# A hit refreshes the entry's LRU position at most this often, so reads rarely write
+_TOUCH_INTERVAL = 60.0
+
+
+class DiskCache:
+    """
+    Tool results in one SQLite file, shared by processes and kept across restarts.
+
+    WAL mode lets any number of readers run alongside one writer, and each
+    thread of each process uses its own connection. Entries carry a wall-clock
+    expiry, so a restarted worker serves them only while still fresh. Values
+    are JSON, zlib-compressed above compress_min bytes. Past max_bytes the
+    least recently used entries are evicted. Every SQLite error is logged and
+    treated as a miss: the cache must never fail a tool call.
+
+    clear(namespace) also bumps the namespace's generation, which in-process
+    caches check to drop their own copies (see TTLCache).
+
+    Args:
+        path: SQLite file (TOOL_CACHE_DISK_PATH)
+        max_bytes: Stored (compressed) bytes kept before LRU eviction
+        compress_min: Serialized size above which values are compressed
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None, compress_min: Optional[int] = None):
+        self.path = path
+        self.max_bytes = max_bytes or int(os.getenv('TOOL_CACHE_DISK_MAX_BYTES', str(256 * 1024 * 1024)))
+        self.compress_min = (compress_min if compress_min is not None
+                             else int(os.getenv('TOOL_CACHE_DISK_COMPRESS_MIN', '1024')))
+        self.busy_timeout_ms = int(os.getenv('TOOL_CACHE_DISK_BUSY_TIMEOUT_MS', '2000'))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """This thread's connection; a forked child opens its own instead of sharing the parent's"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # WAL with NORMAL sync survives process crashes; only a power loss can drop the newest writes
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _error(self, operation: str, error: Exception) -> None:
+        with self._lock:
+            self.errors += 1
+        logger.warning(f"Disk cache {operation} failed: {error}")
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, seconds to live) for a fresh entry, else None"""
+        now = time.time()
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value, compressed, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            value, compressed, expires_at, accessed_at = row
+            if now - accessed_at > _TOUCH_INTERVAL:
+                connection.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                                   (now, namespace, key))
+            decoded = json.loads(zlib.decompress(value) if compressed else value)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            self._error("read", e)
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return decoded, expires_at - now
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value for ttl seconds"""
+        data = json.dumps(value, default=str).encode()
+        compressed = len(data) > self.compress_min
+        if compressed:
+            data = zlib.compress(data, 6)
+
+        now = time.time()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, compressed, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, data, int(compressed), len(data), now + ttl, now)
+            )
+        except sqlite3.Error as e:
+            self._error("write", e)
+            return
+
+        with self._lock:
+            self.writes += 1
+            self._writes += 1
+            sweep = self._writes >= int(os.getenv('TOOL_CACHE_DISK_SWEEP_EVERY', '100'))
+            if sweep:
+                self._writes = 0
+        if sweep:
+            self.sweep()
+
+    def sweep(self) -> None:
+        """Delete expired entries, then least recently used ones until under 90% of max_bytes"""
+        try:
+            connection = self._connect()
+            evicted = connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),)).rowcount
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - int(self.max_bytes * 0.9)
+                # A running total over the LRU order picks the oldest entries that cover the excess
+                evicted += connection.execute(
+                    "DELETE FROM entries WHERE (namespace, key) IN ("
+                    " SELECT namespace, key FROM ("
+                    "  SELECT namespace, key, size, SUM(size) OVER ("
+                    "   ORDER BY accessed_at, namespace, key ROWS UNBOUNDED PRECEDING) AS running FROM entries"
+                    " ) WHERE running - size < ?)",
+                    (excess,)
+                ).rowcount
+        except sqlite3.Error as e:
+            self._error("sweep", e)
+            return
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            logger.info(f"Disk cache evicted {evicted} entries")
+
+    def generation(self, namespace: str) -> int:
+        """Bumped by every clear() of the namespace, from any process"""
+        try:
+            row = self._connect().execute(
+                "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._error("read", e)
+            return -1
+        return row[0] if row else 0
+
+    def clear(self, namespace: str) -> None:
+        """Drop a namespace's entries and bump its generation, in one transaction"""
+        try:
+            with self._connect() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+                connection.execute(
+                    "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                    "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+                    (namespace,)
+                )
+        except sqlite3.Error as e:
+            self._error("clear", e)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {"hits": self.hits, "misses": self.misses, "writes": self.writes,
+                                     "evictions": self.evictions, "errors": self.errors}
+        try:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            stats.update(entries=entries, bytes=size)
+        except sqlite3.Error:
+            pass
+        return stats
+
+
+_shared: Optional[DiskCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared_disk_cache() -> Optional[DiskCache]:
+    """The process-wide disk cache when TOOL_CACHE_DISK_PATH is set, else None"""
+    global _shared
+    path = os.getenv('TOOL_CACHE_DISK_PATH')
+    if not path:
+        return None
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                try:
+                    _shared = DiskCache(path)
+                    logger.info(f"Tool result disk cache at {path}")
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Tool result disk cache unavailable at {path}: {e}")
+                    return None
+    return _shared
@@ -3,45 +3,280 @@ Bedrock Knowledge Base tool for internal data sourcing (RAG)
 """
 
 import os
+import asyncio
+import hashlib
 import logging
-import boto3
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 from strands import tool
+from aws_clients import get_client
+from tool_cache import TTLCache, normalize_query
+from disk_cache import shared_disk_cache
+from singleflight import SingleFlight
+from observability import record_span
+from prefetch import use_prefetched
+from context_packing import estimate_tokens, join_excerpts, pack
+
+if TYPE_CHECKING:
+    from local_kb_index import LocalKnowledgeIndex
 
 logger = logging.getLogger(__name__)
 
-@tool
-def knowledge_search(query: str) -> str:
+# KB content changes rarely, so results are cached for longer than web results.
+# Call invalidate_kb_cache() after the knowledge base is re-synced.
+kb_cache = TTLCache('knowledge_search', ttl=float(os.getenv('KB_CACHE_TTL', '3600')), disk=shared_disk_cache())
+
+# Caches built on KB results elsewhere (e.g. whole answers), dropped along with kb_cache
+_invalidation_listeners: List[Callable[[], None]] = []
+
+# Concurrent misses for the same cache key share one Bedrock call
+kb_flight = SingleFlight('knowledge_search')
+
+# 'retrieve' returns raw chunks for the outer agent to reason over (one model call per turn);
+# 'generate' runs retrieve_and_generate, which adds a second LLM generation inside the tool.
+DEFAULT_SEARCH_MODE = 'retrieve'
+
+# Optional in-process mirror of the knowledge base (KB_LOCAL_INDEX), built on first use
+_local_index: Optional["LocalKnowledgeIndex"] = None
+_local_index_lock = threading.Lock()
+
+
+def _wait_timeout() -> float:
+    """How long a coalesced caller waits on another caller's in-flight KB request"""
+    return float(os.getenv('KB_TIMEOUT', '60'))
+
+
+def _source_uri(location: Dict[str, Any]) -> str:
+    """Pull a readable URI out of a Bedrock retrieval location"""
+    for value in location.values():
+        if isinstance(value, dict):
+            for field in ('uri', 'url', 'id'):
+                if value.get(field):
+                    return value[field]
+    return 'unknown source'
+
+
+def _parse_retrieval_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize one retrieve() result into a chunk dict"""
+    metadata = result.get('metadata') or {}
+    return {
+        'text': result.get('content', {}).get('text', ''),
+        'score': result.get('score'),
+        'source': _source_uri(result.get('location') or {}),
+        'chunk_id': metadata.get('x-amz-bedrock-kb-chunk-id')
+    }
+
+
+def chunk_key(chunk: Dict[str, Any]) -> str:
+    """Identity of a KB chunk: its chunk id, or its source plus a hash of its normalized text"""
+    if chunk.get('chunk_id'):
+        return chunk['chunk_id']
+    digest = hashlib.sha1(normalize_query(chunk['text']).encode()).hexdigest()
+    return f"{chunk.get('source')}#{digest}"
+
+
+def fuse_chunks(chunk_lists: List[List[Dict[str, Any]]], k: int = 60) -> List[Dict[str, Any]]:
     """
-    Search company knowledge base for internal information.
-    Use this for company policies, procedures, documentation, and internal knowledge.
-    
-    Args:
-        query: The search query string
-        
-    Returns:
-        Relevant information from company knowledge base
+    Merge ranked chunk lists from several queries with reciprocal rank fusion.
+
+    Each chunk scores sum(1 / (k + rank)) over the lists it appears in, so a
+    chunk several phrasings agree on outranks one a single query scored
+    highly. Duplicates collapse to one entry keeping the best retrieval score.
     """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for chunk_list in chunk_lists:
+        for rank, chunk in enumerate(chunk_list, 1):
+            key = chunk_key(chunk)
+            entry = fused.get(key)
+            if entry is None:
+                entry = fused[key] = {**chunk, 'rrf': 0.0, 'matches': 0}
+            elif (chunk.get('score') or 0) > (entry.get('score') or 0):
+                entry['score'] = chunk['score']
+            entry['rrf'] += 1.0 / (k + rank)
+            entry['matches'] += 1
+    return sorted(fused.values(), key=lambda c: (c['rrf'], c.get('score') or 0), reverse=True)
+
+
+def _chunk_header(chunk: Dict[str, Any], number: int) -> str:
+    score = f"{chunk['score']:.3f}" if chunk.get('score') is not None else 'n/a'
+    header = f"[{number}] score={score} source={chunk['source']}"
+    if chunk.get('matches', 1) > 1:
+        # Retrieved by several of a multi-query search's phrasings
+        header += f" matched={chunk['matches']}"
+    return header
+
+
+def format_chunks(chunks: List[Dict[str, Any]], token_budget: int, query: str) -> str:
+    """Render the chunk passages most relevant to query as a numbered context block within a token budget"""
+    lines = []
+    packed = pack(query, chunks, token_budget, overhead=lambda chunk: estimate_tokens(_chunk_header(chunk, 0)))
+    for i, (chunk, excerpts) in enumerate(packed, 1):
+        lines.append(_chunk_header(chunk, i))
+        lines.append(join_excerpts(excerpts))
+    return "\n".join(lines)
+
+
+def invalidate_kb_cache() -> None:
+    """Drop all cached knowledge base results, e.g. after a KB re-sync"""
+    kb_cache.clear()
+    for listener in _invalidation_listeners:
+        listener()
+    logger.info("Knowledge base result cache invalidated")
+
+
+def on_kb_invalidation(listener: Callable[[], None]) -> None:
+    """Call listener whenever invalidate_kb_cache() runs"""
+    _invalidation_listeners.append(listener)
+
+
+def get_local_index() -> Optional["LocalKnowledgeIndex"]:
+    """The local snapshot index when KB_LOCAL_INDEX is set, else None"""
+    global _local_index
+    root = os.getenv('KB_LOCAL_INDEX')
+    if not root:
+        return None
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                # Imported on first use, so importing this module does not load numpy
+                from local_kb_index import LocalKnowledgeIndex
+
+                # Results cached from the previous snapshot are dropped when a new one goes live
+                _local_index = LocalKnowledgeIndex(root, knowledge_base_id=os.getenv('KNOWLEDGE_BASE_ID'),
+                                                   on_swap=invalidate_kb_cache, disk=shared_disk_cache())
+    return _local_index
+
+
+def retrieve_chunks(query: str) -> List[Dict[str, Any]]:
+    """Retrieve-only path: top-k chunks with scores and sources, no generation"""
+    chunks = use_prefetched("kb", query, _wait_timeout())
+    if chunks is not None:
+        return chunks
+
     knowledge_base_id = os.getenv('KNOWLEDGE_BASE_ID')
-    
-    try:
-        session = boto3.Session(profile_name=os.getenv('AWS_PROFILE'))
-        client = session.client('bedrock-agent-runtime', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        
-        logger.info(f"Searching Knowledge Base {knowledge_base_id} for: {query}")
-        
-        response = client.retrieve_and_generate(
+    top_k = int(os.getenv('KB_TOP_K', '5'))
+
+    key = f"retrieve:{knowledge_base_id}:{top_k}:{normalize_query(query)}"
+    chunks = kb_cache.get(key)
+    if chunks is not None:
+        logger.info(f"Knowledge base cache hit for: {query}")
+        record_span("cache", "knowledge_search", 0.0, hit=True)
+        return chunks
+
+    def fetch() -> List[Dict[str, Any]]:
+        local_index = get_local_index()
+        chunks = local_index.search(query, top_k) if local_index is not None else None
+        if chunks is not None:
+            logger.info(f"Retrieved from local KB snapshot for: {query}")
+            kb_cache.set(key, chunks)
+            return chunks
+
+        logger.info(f"Retrieving from Knowledge Base {knowledge_base_id} for: {query}")
+        response = get_client('bedrock-agent-runtime').retrieve(
+            knowledgeBaseId=knowledge_base_id,
+            retrievalQuery={'text': query},
+            retrievalConfiguration={
+                'vectorSearchConfiguration': {'numberOfResults': top_k}
+            }
+        )
+
+        chunks = [_parse_retrieval_result(r) for r in response.get('retrievalResults', [])]
+        kb_cache.set(key, chunks)
+        return chunks
+
+    return kb_flight.do(key, fetch, timeout=_wait_timeout())
+
+
+def generate_answer(query: str) -> str:
+    """Generate path: Bedrock answers from the knowledge base with its own model call"""
+    knowledge_base_id = os.getenv('KNOWLEDGE_BASE_ID')
+    region = os.getenv('AWS_REGION', 'us-east-1')
+    model_arn = os.getenv(
+        'KB_MODEL_ARN',
+        f'arn:aws:bedrock:{region}::foundation-model/anthropic.claude-3-haiku-20240307-v1:0'
+    )
+
+    key = f"generate:{knowledge_base_id}:{model_arn}:{normalize_query(query)}"
+    answer = kb_cache.get(key)
+    if answer is not None:
+        logger.info(f"Knowledge base cache hit for: {query}")
+        record_span("cache", "knowledge_search", 0.0, hit=True)
+        return answer
+
+    def fetch() -> str:
+        logger.info(f"Generating from Knowledge Base {knowledge_base_id} for: {query}")
+        response = get_client('bedrock-agent-runtime').retrieve_and_generate(
             input={'text': query},
             retrieveAndGenerateConfiguration={
                 'type': 'KNOWLEDGE_BASE',
                 'knowledgeBaseConfiguration': {
                     'knowledgeBaseId': knowledge_base_id,
-                    'modelArn': 'arn:aws:bedrock:us-east-1::foundation-model/anthropic.claude-3-haiku-20240307-v1:0'
+                    'modelArn': model_arn
                 }
             }
         )
-        
-        return response['output']['text']
-        
+
+        answer = response['output']['text']
+        kb_cache.set(key, answer)
+        return answer
+
+    return kb_flight.do(key, fetch, timeout=_wait_timeout())
+
+
+def _unique_queries(query: str, queries: Optional[List[str]]) -> List[str]:
+    """Merge the single and list forms; phrasings with the same cache key would only repeat each other"""
+    unique: Dict[str, str] = {}
+    for q in [query or '', *(queries or [])]:
+        if normalize_query(q):
+            unique.setdefault(normalize_query(q), q.strip())
+    return list(unique.values())[:int(os.getenv('KB_MAX_QUERIES', '4'))]
+
+
+@tool
+async def knowledge_search(query: str = "", queries: Optional[List[str]] = None) -> str:
+    """
+    Search company knowledge base for internal information.
+    Use this for company policies, procedures, documentation, and internal knowledge.
+    To try several phrasings, pass them together in queries rather than calling
+    this tool repeatedly: they are searched in parallel and merged into one ranked result.
+
+    Args:
+        query: The search query string
+        queries: Optional list of up to four alternative phrasings of the query
+
+    Returns:
+        Relevant information from company knowledge base
+    """
+    mode = os.getenv('KB_SEARCH_MODE', DEFAULT_SEARCH_MODE).lower()
+    queries = _unique_queries(query, queries)
+    if not queries:
+        return "No query given."
+
+    try:
+        if mode == 'generate':
+            answers = await asyncio.gather(*(asyncio.to_thread(generate_answer, q) for q in queries))
+            if len(queries) == 1:
+                return answers[0]
+            return "\n\n".join(f"**{q}:** {answer}" for q, answer in zip(queries, answers))
+
+        if len(queries) > 1:
+            logger.info(f"Searching Knowledge Base with {len(queries)} queries")
+        outcomes = await asyncio.gather(*(asyncio.to_thread(retrieve_chunks, q) for q in queries),
+                                        return_exceptions=True)
+        failures = [(q, o) for q, o in zip(queries, outcomes) if isinstance(o, Exception)]
+        if len(failures) == len(queries):
+            raise failures[0][1]
+        for q, error in failures:
+            logger.error(f"Knowledge base search error for '{q}': {error}")
+
+        chunks = fuse_chunks([o for o in outcomes if not isinstance(o, Exception)])
+        if not chunks:
+            return "No relevant information found in the knowledge base."
+        result = format_chunks(chunks, int(os.getenv('KB_TOKEN_BUDGET', '1500')), " ".join(queries))
+        if failures:
+            result += "\n(Search failed for: " + "; ".join(q for q, _ in failures) + ")"
+        return result
+
     except Exception as e:
         logger.error(f"Knowledge base search error: {e}")
         return f"Knowledge search failed: {str(e)}"
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Load harness for the agent invoke path
+
+Drives invoke() with many concurrent callers and reports latency percentiles,
+time to first token, throughput and error rate. Two targets:
+
+  inproc   imports agent.py and calls invoke() directly (default)
+  http     POSTs to a running runtime's /invocations (see --url, --spawn-server)
+
+Offline by default: AGENT_STUB_BACKENDS=true swaps in the stub model, knowledge
+base and Tavily from stubs.py (latencies via STUB_*_MS). Pass --live to use the
+real backends. Save a run with --output and check a later run against it with
+--compare; the exit code is 1 when p95 latency or error rate regress.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_PROMPTS = [
+    "Hello! What can you help me with?",
+    "What is our company PTO policy?",
+    "What are the latest developments in serverless computing?",
+    "Explain what AWS Lambda is in simple terms.",
+    "Research how our expense policy compares with industry practice.",
+    "Summarize what we discussed so far.",
+]
+
+
+def load_prompts(path: Optional[str]) -> List[str]:
+    """Prompt corpus: one prompt per line, or JSONL with a "prompt" field"""
+    if not path:
+        return DEFAULT_PROMPTS
+    prompts = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                prompts.append(json.loads(line)['prompt'] if line.startswith('{') else line)
+    return prompts
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 1)
+
+
+class InProcessTarget:
+    """Calls agent.invoke() in this process"""
+
+    def __init__(self, concurrency: int):
+        import agent
+        self.agent = agent
+        # Sync invokes block a thread for the whole turn, so size the pool to the callers
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def call(self, payload: Dict[str, Any], sample: Dict[str, Any], start: float) -> None:
+        if not payload.get("stream"):
+            response = await asyncio.get_running_loop().run_in_executor(self.executor, self.agent.invoke, payload)
+            sample["status"] = response.get("status")
+            sample["error"] = response.get("error")
+            sample["usage"] = response.get("usage")
+            sample["route"] = response.get("route")
+            return
+
+        async for event in self.agent.invoke(payload):
+            record_event(event, sample, start)
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+class HttpTarget:
+    """POSTs to the runtime HTTP interface"""
+
+    def __init__(self, url: str, concurrency: int):
+        import aiohttp
+        self.url = url.rstrip('/') + '/invocations'
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=300)
+        )
+
+    async def call(self, payload: Dict[str, Any], sample: Dict[str, Any], start: float) -> None:
+        async with self.session.post(self.url, json=payload) as response:
+            if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                body = await response.json(content_type=None)
+                sample["status"] = body.get("status") if response.status == 200 else f"http_{response.status}"
+                sample["error"] = body.get("error")
+                sample["usage"] = body.get("usage")
+                sample["route"] = body.get("route")
+                return
+
+            async for line in response.content:
+                if line.startswith(b'data: '):
+                    record_event(json.loads(line[len(b'data: '):]), sample, start)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+def record_event(event: Dict[str, Any], sample: Dict[str, Any], start: float) -> None:
+    """Fold one streamed event into the request's sample"""
+    if event.get("type") == "text" and "ttft_ms" not in sample:
+        sample["ttft_ms"] = (time.perf_counter() - start) * 1000
+    elif event.get("type") == "final":
+        sample["status"] = event.get("status")
+        sample["usage"] = event.get("usage")
+        sample["route"] = event.get("route")
+    elif event.get("type") in ("busy", "error"):
+        sample["status"] = event.get("status")
+        sample["error"] = event.get("error")
+
+
+async def run_load(target: Any, args: argparse.Namespace, prompts: List[str]) -> List[Dict[str, Any]]:
+    """Run args.requests requests from args.concurrency concurrent callers"""
+    samples: List[Dict[str, Any]] = []
+    counter = itertools.count()
+    run_id = datetime.now().strftime('%H%M%S')
+
+    async def worker() -> None:
+        while True:
+            i = next(counter)
+            if i >= args.requests:
+                return
+            # Sessions are reused round-robin so multi-turn memory is exercised
+            session_index = i % args.sessions
+            payload = {
+                "prompt": prompts[i % len(prompts)],
+                "session_id": f"load-{run_id}-{session_index:04d}-{'x' * 24}",
+                "user_id": f"load-user-{session_index % args.users}",
+                "stream": args.stream
+            }
+            if args.prefetch:
+                payload["prefetch"] = True
+            sample: Dict[str, Any] = {"status": None}
+            start = time.perf_counter()
+            try:
+                await target.call(payload, sample, start)
+            except Exception as e:
+                sample["status"] = "exception"
+                sample["error"] = str(e)
+            sample["latency_ms"] = (time.perf_counter() - start) * 1000
+            samples.append(sample)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return samples
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    ok = [s for s in samples if s["status"] == "success"]
+    busy = [s for s in samples if s["status"] == "busy"]
+    latencies = [s["latency_ms"] for s in ok]
+    ttfts = [s["ttft_ms"] for s in ok if "ttft_ms" in s]
+    usages = [s["usage"] for s in ok if s.get("usage")]
+
+    def mean_usage(field: str) -> Optional[int]:
+        return round(sum(u.get(field, 0) for u in usages) / len(usages)) if usages else None
+
+    routes: Dict[str, int] = {}
+    for s in ok:
+        if s.get("route"):
+            routes[s["route"]["tier"]] = routes.get(s["route"]["tier"], 0) + 1
+
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if s["status"] not in ("success", "busy"):
+            message = str(s.get("error") or s["status"])[:80]
+            errors[message] = errors.get(message, 0) + 1
+
+    return {
+        "requests": len(samples),
+        "success": len(ok),
+        "busy": len(busy),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / max(len(samples), 1), 4),
+        "busy_rate": round(len(busy) / max(len(samples), 1), 4),
+        "rps": round(len(samples) / elapsed, 2),
+        "latency_ms": {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95),
+                       "p99": percentile(latencies, 99)},
+        "ttft_ms": {"p50": percentile(ttfts, 50), "p95": percentile(ttfts, 95), "p99": percentile(ttfts, 99)},
+        "mean_input_tokens": mean_usage("inputTokens"),
+        "mean_cache_read_tokens": mean_usage("cacheReadInputTokens"),
+        "mean_cache_write_tokens": mean_usage("cacheWriteInputTokens"),
+        "routes": routes,
+        "error_messages": errors
+    }
+
+
+def print_summary(summary: Dict[str, Any]) -> None:
+    def fmt(value):
+        return f"{value:>10.1f}" if value is not None else f"{'n/a':>10}"
+
+    print(f"Requests: {summary['requests']}   OK: {summary['success']}   Busy: {summary['busy']}   "
+          f"Errors: {summary['errors']} ({summary['error_rate']:.1%})   Throughput: {summary['rps']} req/s")
+    print()
+    print(f"{'':<14}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name in ("latency_ms", "ttft_ms"):
+        values = summary[name]
+        print(f"{name:<14}{fmt(values['p50'])}{fmt(values['p95'])}{fmt(values['p99'])}")
+    if summary["mean_input_tokens"] is not None:
+        print(f"\nMean tokens per turn: input={summary['mean_input_tokens']} "
+              f"cache_read={summary.get('mean_cache_read_tokens')} cache_write={summary.get('mean_cache_write_tokens')}")
+    if summary.get("routes"):
+        print("Model tiers: " + ", ".join(f"{tier}={count}" for tier, count in sorted(summary["routes"].items())))
+    for message, count in summary["error_messages"].items():
+        print(f"❌ {count}x {message}")
+
+
+def compare(summary: Dict[str, Any], baseline_path: str, max_regression: float) -> bool:
+    """Print deltas against a saved run; returns False if the run regressed"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["summary"]
+
+    print()
+    print(f"📊 Compared with {baseline_path}")
+    print(f"{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}")
+
+    regressed = False
+    rows = [("rps", baseline["rps"], summary["rps"])]
+    for name in ("latency_ms", "ttft_ms"):
+        for pct in ("p50", "p95", "p99"):
+            rows.append((f"{name} {pct}", baseline[name][pct], summary[name][pct]))
+    rows.append(("error_rate", baseline["error_rate"], summary["error_rate"]))
+
+    for metric, before, after in rows:
+        if before is None or after is None:
+            continue
+        change = (after - before) / before if before else 0.0
+        print(f"{metric:<18}{before:>12}{after:>12}{change:>+10.1%}")
+        if metric == "latency_ms p95" and change > max_regression:
+            regressed = True
+        if metric == "error_rate" and after > before + 0.01:
+            regressed = True
+
+    print()
+    print("❌ Regression detected" if regressed else "✅ No regression")
+    return not regressed
+
+
+def spawn_server(url: str) -> subprocess.Popen:
+    """Start agent.py with stub backends and wait for /ping"""
+    import requests
+
+    env = dict(os.environ, AGENT_STUB_BACKENDS="true")
+    here = os.path.dirname(os.path.abspath(__file__))
+    # The server's log goes to a scratch file, shown only if it fails to start
+    log = tempfile.TemporaryFile()
+    server = subprocess.Popen([sys.executable, os.path.join(here, "agent.py")], env=env, cwd=here,
+                              stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.time() + 60
+    while time.time() < deadline and server.poll() is None:
+        try:
+            if requests.get(url.rstrip('/') + '/ping', timeout=1).ok:
+                return server
+        except requests.RequestException:
+            time.sleep(0.25)
+
+    reason = (f"exited with code {server.returncode}" if server.poll() is not None
+              else "did not become healthy within 60s")
+    server.terminate()
+    log.seek(0)
+    output = log.read().decode(errors="replace").strip()
+    raise RuntimeError(f"Agent server {reason}" + (f":\n{output[-4000:]}" if output else ""))
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    prompts = load_prompts(args.prompts)
+    if args.target == "http":
+        target = HttpTarget(args.url, args.concurrency)
+    else:
+        target = InProcessTarget(args.concurrency)
+
+    try:
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "requests": args.warmup})
+            await run_load(target, warmup, prompts)
+
+        start = time.perf_counter()
+        samples = await run_load(target, args, prompts)
+        return summarize(samples, time.perf_counter() - start)
+    finally:
+        await target.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', choices=['inproc', 'http'], default='inproc')
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help='runtime base URL for --target http')
+    parser.add_argument('--spawn-server', action='store_true', help='start agent.py with stub backends for --target http')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=0, help='requests run before measuring')
+    parser.add_argument('--sessions', type=int, default=32, help='distinct session ids (turns reuse them)')
+    parser.add_argument('--users', type=int, default=8, help='distinct user ids the sessions belong to')
+    parser.add_argument('--prompts', help='prompt corpus file (lines or JSONL with "prompt")')
+    parser.add_argument('--no-stream', dest='stream', action='store_false', help='use the JSON response path')
+    parser.add_argument('--prefetch', action='store_true', help='enable speculative tool prefetch per request')
+    parser.add_argument('--live', action='store_true', help='use real Bedrock/KB/Tavily instead of stubs')
+    parser.add_argument('--output', help='write the run as JSON')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output')
+    parser.add_argument('--verbose', action='store_true', help='keep the agent\'s logging')
+    parser.add_argument('--max-regression', type=float, default=0.2, help='allowed p95 latency increase (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # Per-turn logs from the agent (and busy rejections) would drown the report
+        logging.disable(logging.WARNING)
+
+    if not args.live:
+        os.environ["AGENT_STUB_BACKENDS"] = "true"
+        # Resolve credentials from the environment instead of probing IMDS
+        os.environ.pop('AWS_PROFILE', None)
+        os.environ.setdefault('AWS_ACCESS_KEY_ID', 'load-test')
+        os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'load-test')
+
+    print("🚀 Agent load test")
+    print("=" * 60)
+    print(f"Target: {args.target}   Backends: {'live' if args.live else 'stub'}   Stream: {args.stream}")
+    print(f"Concurrency: {args.concurrency}   Requests: {args.requests}   Sessions: {args.sessions}")
+    print()
+
+    server = spawn_server(args.url) if args.target == "http" and args.spawn_server else None
+    try:
+        summary = asyncio.run(main_async(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print_summary(summary)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "config": vars(args), "summary": summary}, f, indent=2)
+        print(f"\n💾 Saved to {args.output}")
+
+    if args.compare and not compare(summary, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
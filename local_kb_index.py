@@ -0,0 +1,261 @@
+"""
+Local mirror of the Bedrock Knowledge Base: in-process top-k vector search
+over an exported snapshot of chunk texts and embeddings
+"""
+
+import os
+import json
+import time
+import shutil
+import itertools
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+import numpy as np
+from aws_clients import get_client
+from observability import span
+
+if TYPE_CHECKING:
+    from disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+# Snapshot layout: <root>/<version>/{manifest.json,chunks.jsonl,embeddings.npy}.
+# <root>/CURRENT names the live version and is replaced atomically, so a
+# running agent switches to a new snapshot on its next lookup.
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+CHUNKS = "chunks.jsonl"
+EMBEDDINGS = "embeddings.npy"
+
+DEFAULT_EMBEDDING_MODEL = "amazon.titan-embed-text-v2:0"
+
+# Disk cache record of the snapshot version the shared cached results came from
+_VERSION_NAMESPACE = "kb_index"
+_VERSION_KEY = "live_version"
+_VERSION_TTL = 365 * 24 * 3600.0
+
+
+def embed_text(text: str, model_id: str, dimensions: int) -> np.ndarray:
+    """Embed one text with a Titan text embedding model, unit-normalized"""
+    response = get_client('bedrock-runtime').invoke_model(
+        modelId=model_id,
+        body=json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True}),
+        contentType="application/json",
+        accept="application/json"
+    )
+    vector = np.asarray(json.loads(response['body'].read())['embedding'], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class Snapshot:
+    """One loaded snapshot: chunk metadata in memory, embeddings memory-mapped"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, MANIFEST)) as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        with open(os.path.join(path, CHUNKS)) as f:
+            self.chunks: List[Dict[str, Any]] = [json.loads(line) for line in f if line.strip()]
+        # Rows are unit vectors, so a dot product with the query is the cosine similarity
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS), mmap_mode='r')
+        if self.embeddings.shape[0] != len(self.chunks):
+            raise ValueError(f"snapshot {self.version} has {len(self.chunks)} chunks "
+                             f"but {self.embeddings.shape[0]} embeddings")
+
+    @property
+    def age_s(self) -> float:
+        return time.time() - float(self.manifest.get('created_at', 0))
+
+    def search(self, vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """Top-k chunks by cosine similarity, best first"""
+        if not self.chunks or top_k <= 0:
+            return []
+        scores = self.embeddings @ vector
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [{**self.chunks[i], 'score': round(float(scores[i]), 4)} for i in best]
+
+
+class LocalKnowledgeIndex:
+    """
+    Serves knowledge base lookups from the newest local snapshot.
+
+    search() returns None whenever the snapshot cannot answer: missing,
+    older than max_age_s, built for another knowledge base, or the query
+    embedding failed. The caller then falls back to the remote Bedrock KB.
+    CURRENT is re-read at most every check_interval_s; a new version is
+    loaded by one caller while the others keep using the old snapshot.
+
+    on_swap runs when a different version replaces the live snapshot. On the
+    first load it runs only if the disk cache records that its shared results
+    came from another version, so starting or pre-warming a worker does not
+    wipe the cache the other workers share.
+
+    Args:
+        root: Snapshot directory (KB_LOCAL_INDEX)
+        max_age_s: Oldest snapshot still served (KB_LOCAL_MAX_AGE)
+        check_interval_s: How often to look for a new snapshot (KB_LOCAL_CHECK_INTERVAL)
+        knowledge_base_id: Only serve snapshots exported from this knowledge base
+        on_swap: Called after a new snapshot goes live, e.g. to drop cached results
+        disk: Shared disk cache whose results on_swap invalidates; records the version they came from
+    """
+
+    def __init__(self, root: str, max_age_s: Optional[float] = None, check_interval_s: Optional[float] = None,
+                 knowledge_base_id: Optional[str] = None, on_swap: Optional[Callable[[], None]] = None,
+                 disk: Optional["DiskCache"] = None):
+        self.root = root
+        self.max_age_s = (max_age_s if max_age_s is not None
+                          else float(os.getenv('KB_LOCAL_MAX_AGE', '86400')))
+        self.check_interval_s = (check_interval_s if check_interval_s is not None
+                                 else float(os.getenv('KB_LOCAL_CHECK_INTERVAL', '30')))
+        self.knowledge_base_id = knowledge_base_id
+        self.on_swap = on_swap
+        self.disk = disk
+        self._snapshot: Optional[Snapshot] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.local = 0
+        self.fallbacks = 0
+        self.swaps = 0
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, CURRENT)) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> Optional[Snapshot]:
+        """Load the version named by CURRENT if it changed; returns the live snapshot"""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval_s:
+            return self._snapshot
+        if not self._reload_lock.acquire(blocking=force):
+            return self._snapshot
+        try:
+            self._checked_at = now
+            version = self._current_version()
+            live = self._snapshot
+            if version is None or (live is not None and live.version == version):
+                return live
+            try:
+                snapshot = Snapshot(os.path.join(self.root, version))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Local KB snapshot {version} failed to load, keeping current: {e}")
+                return live
+            self._snapshot = snapshot
+            with self._lock:
+                self.swaps += 1
+            logger.info(f"Local KB snapshot {version} live: {len(snapshot.chunks)} chunks, "
+                        f"{snapshot.embeddings.shape[1] if snapshot.chunks else 0} dims, "
+                        f"{snapshot.age_s / 3600:.1f}h old")
+            if self._replaces(live, version) and self.on_swap is not None:
+                self.on_swap()
+            if self.disk is not None:
+                self.disk.set(_VERSION_NAMESPACE, _VERSION_KEY, version, _VERSION_TTL)
+            return snapshot
+        finally:
+            self._reload_lock.release()
+
+    def _replaces(self, live: Optional[Snapshot], version: str) -> bool:
+        """Whether loading version swaps out the snapshot that cached results came from"""
+        if live is not None:
+            return live.version != version
+        if self.disk is None:
+            # Nothing cached outlives this process, so a first load has nothing to invalidate
+            return False
+        recorded = self.disk.get(_VERSION_NAMESPACE, _VERSION_KEY)
+        return recorded is not None and recorded[0] != version
+
+    def _usable(self, snapshot: Optional[Snapshot]) -> Optional[str]:
+        """Why the snapshot cannot serve a lookup, or None if it can"""
+        if snapshot is None:
+            return "missing"
+        if snapshot.age_s > self.max_age_s:
+            return f"stale ({snapshot.age_s / 3600:.1f}h old)"
+        exported_from = snapshot.manifest.get('knowledge_base_id')
+        if self.knowledge_base_id and exported_from and exported_from != self.knowledge_base_id:
+            return f"built for knowledge base {exported_from}"
+        return None
+
+    def search(self, query: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        """Top-k chunks for query from the local snapshot, or None to use the remote KB"""
+        snapshot = self.refresh()
+        reason = self._usable(snapshot)
+        if reason is None:
+            try:
+                with span("local_kb", "search", version=snapshot.version):
+                    vector = embed_text(query, snapshot.manifest.get('embedding_model', DEFAULT_EMBEDDING_MODEL),
+                                        int(snapshot.embeddings.shape[1]))
+                    chunks = snapshot.search(vector, top_k)
+                with self._lock:
+                    self.local += 1
+                return chunks
+            except Exception as e:
+                reason = f"query failed: {e}"
+
+        logger.info(f"Local KB snapshot unusable ({reason}), using Bedrock Knowledge Base")
+        with self._lock:
+            self.fallbacks += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        with self._lock:
+            stats: Dict[str, Any] = {"local": self.local, "fallbacks": self.fallbacks, "swaps": self.swaps,
+                                     "chunks": len(snapshot.chunks) if snapshot is not None else 0}
+        if snapshot is not None:
+            stats["age_s"] = round(snapshot.age_s, 1)
+        return stats
+
+
+def write_snapshot(root: str, chunks: List[Dict[str, Any]], embeddings: np.ndarray, manifest: Dict[str, Any],
+                   keep: int = 2) -> str:
+    """
+    Write a snapshot version under root and make it current.
+
+    Files are written into a fresh version directory before CURRENT is
+    replaced, so readers never see a partial snapshot. All but the newest
+    keep versions are removed; a process still mapping a removed version
+    keeps reading it until it swaps.
+    """
+    if not chunks or embeddings.ndim != 2 or embeddings.shape[0] != len(chunks):
+        raise ValueError(f"{len(chunks)} chunks but embeddings of shape {embeddings.shape}")
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+
+    stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime()) + f"-{os.getpid()}"
+    # Several writes in one second get a counter suffix; zero-padded, so versions still sort by age
+    for attempt in itertools.count():
+        version = stamp if attempt == 0 else f"{stamp}-{attempt:04d}"
+        path = os.path.join(root, version)
+        try:
+            os.makedirs(path)
+            break
+        except FileExistsError:
+            continue
+    np.save(os.path.join(path, EMBEDDINGS), vectors)
+    with open(os.path.join(path, CHUNKS), 'w') as f:
+        for chunk in chunks:
+            f.write(json.dumps({field: chunk.get(field) for field in ('text', 'source', 'chunk_id')}) + "\n")
+    with open(os.path.join(path, MANIFEST), 'w') as f:
+        json.dump({**manifest, 'created_at': manifest.get('created_at', time.time()),
+                   'chunks': len(chunks), 'dimensions': int(vectors.shape[1])}, f, indent=2)
+
+    current = os.path.join(root, CURRENT)
+    with open(current + ".tmp", 'w') as f:
+        f.write(version + "\n")
+    os.replace(current + ".tmp", current)
+
+    versions = sorted(d for d in os.listdir(root) if os.path.isfile(os.path.join(root, d, MANIFEST)))
+    for old in versions[:-keep] if keep > 0 else []:
+        if old != version:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return path
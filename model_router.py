@@ -0,0 +1,172 @@
+"""
+Complexity-based model routing: small model for chat, mid-tier for standard
+questions, large model only for multi-step research
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+from strands.models import Model
+
+logger = logging.getLogger(__name__)
+
+SMALL, MEDIUM, LARGE = "small", "medium", "large"
+TIERS = (SMALL, MEDIUM, LARGE)
+
+# Greetings, thanks and acknowledgements that need neither tools nor a large model
+_CHAT = re.compile(
+    r"^(?:(?:hi|hello|hey|yo|hiya|howdy|good (?:morning|afternoon|evening)|thanks?(?: you)?(?: so much)?|thx|ty|"
+    r"cheers|ok(?:ay)?|cool|great|nice|awesome|got it|sounds good|bye|goodbye|see you|"
+    r"how are you(?: doing)?|what'?s up|who are you|what can you (?:do|help (?:me )?with))\b"
+    r"(?:\s+(?:there|again|a lot|for (?:that|the help)|today))?[\s!.,?]*)+$",
+    re.IGNORECASE
+)
+
+# Wording that asks for several lookups or an analysis across sources
+_RESEARCH = re.compile(
+    r"\b(compare|comparison|versus|vs\.?|contrast|trade-?offs?|pros and cons|analy[sz]e|analysis|"
+    r"research|investigate|evaluate|assess|in[- ]depth|comprehensive|detailed report|step[- ]by[- ]step|"
+    r"cross-?check|cross-?validate|implications|strategy|recommend(ation)?s?)\b",
+    re.IGNORECASE
+)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+class Route:
+    """Routing decision for one turn"""
+
+    __slots__ = ('tier', 'reason', 'classify_us')
+
+    def __init__(self, tier: str, reason: str, classify_us: float = 0.0):
+        self.tier = tier
+        self.reason = reason
+        self.classify_us = classify_us
+
+
+def classify(prompt: str) -> Route:
+    """
+    Sort a prompt into a tier with a local heuristic (microseconds, no model call).
+
+    small:  short greetings and acknowledgements
+    large:  research wording, several questions, or a long multi-part prompt
+    medium: everything else
+    """
+    start = time.perf_counter()
+    text = prompt.strip()
+    words = len(text.split())
+
+    if words <= _env_int("ROUTER_CHAT_MAX_WORDS", 8) and _CHAT.match(text):
+        tier, reason = SMALL, "chat"
+    elif _RESEARCH.search(text):
+        tier, reason = LARGE, "research wording"
+    elif text.count("?") >= 2:
+        tier, reason = LARGE, "multiple questions"
+    elif words >= _env_int("ROUTER_LARGE_MIN_WORDS", 60):
+        tier, reason = LARGE, "long prompt"
+    else:
+        tier, reason = MEDIUM, "standard question"
+
+    return Route(tier, reason, round((time.perf_counter() - start) * 1e6, 1))
+
+
+class ToolFreeModel(Model):
+    """Wraps a model so its calls carry no tool specs: the model can only answer directly"""
+
+    def __init__(self, model: Model):
+        self.model = model
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.model.config
+
+    def update_config(self, **model_config: Any) -> None:
+        self.model.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self.model.get_config()
+
+    def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        return self.model.structured_output(output_model, prompt, system_prompt=system_prompt, **kwargs)
+
+    async def count_tokens(self, messages, tool_specs=None, system_prompt=None, system_prompt_content=None) -> int:
+        return await self.model.count_tokens(messages, None, system_prompt, system_prompt_content)
+
+    def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs) -> AsyncIterator[Any]:
+        # Earlier turns may still hold toolUse blocks; Bedrock then adds a placeholder tool spec itself
+        return self.model.stream(messages, None, system_prompt, **kwargs)
+
+
+class TierRouter:
+    """
+    Picks the model for each turn and keeps per-tier latency, so every
+    decision can be reported with the latency it saved against the large tier.
+
+    Args:
+        models: Tier name -> model; the small tier's model is used without tools
+        alpha: Weight of the newest turn in each tier's moving average latency
+    """
+
+    def __init__(self, models: Dict[str, Model], alpha: float = 0.2):
+        self.models = {tier: ToolFreeModel(model) if tier == SMALL else model for tier, model in models.items()}
+        self.alpha = alpha
+        self._latency_ms: Dict[str, Optional[float]] = {tier: None for tier in TIERS}
+        self._turns = {tier: 0 for tier in TIERS}
+        self._saved_ms = 0.0
+        self._lock = threading.Lock()
+
+    def route(self, prompt: str, override: Optional[str] = None) -> Route:
+        """Route a prompt; a valid override (payload "model_tier") wins over the heuristic"""
+        if override in self.models:
+            return Route(override, "requested")
+        if len(self.models) == 1:
+            return Route(next(iter(self.models)), "routing disabled")
+        route = classify(prompt)
+        logger.info(f"Routed to {route.tier} ({route.reason}) in {route.classify_us}us")
+        return route
+
+    def model_for(self, route: Route) -> Model:
+        return self.models[route.tier]
+
+    def record(self, route: Route, latency_ms: float) -> Dict[str, Any]:
+        """
+        Fold a finished turn into its tier's latency average and return the
+        decision for the response. saved_ms is the large tier's average minus
+        this turn's latency (None until the large tier has been observed).
+        """
+        with self._lock:
+            previous = self._latency_ms[route.tier]
+            self._latency_ms[route.tier] = (
+                latency_ms if previous is None else previous + self.alpha * (latency_ms - previous)
+            )
+            self._turns[route.tier] += 1
+            baseline = self._latency_ms[LARGE]
+            saved_ms = None
+            if route.tier != LARGE and baseline is not None:
+                saved_ms = round(baseline - latency_ms, 1)
+                self._saved_ms += saved_ms
+        return self.describe(route, saved_ms)
+
+    def describe(self, route: Route, saved_ms: Optional[float] = None) -> Dict[str, Any]:
+        """The decision for a response, without recording a turn (e.g. one answered from a cache)"""
+        return {
+            "tier": route.tier,
+            "model_id": self.models[route.tier].config.get("model_id"),
+            "reason": route.reason,
+            "classify_us": route.classify_us,
+            "saved_ms": saved_ms,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {"saved_ms_total": round(self._saved_ms, 1)}
+            for tier in TIERS:
+                stats[f"{tier}_turns"] = self._turns[tier]
+                if self._latency_ms[tier] is not None:
+                    stats[f"{tier}_latency_ms_avg"] = round(self._latency_ms[tier], 1)
+        return stats
@@ -0,0 +1,301 @@
+"""
+Lightweight tracing and Prometheus metrics for the agent hot path
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from strands.hooks import (
+    AfterModelCallEvent,
+    AfterToolCallEvent,
+    BeforeModelCallEvent,
+    HookProvider,
+    HookRegistry,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, in seconds"""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        # Per label set: bucket counts (last slot is +Inf), sum, count
+        self._series: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, (total, count)) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', le))} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {int(count)}")
+        return lines
+
+
+turn_duration = Histogram("agent_turn_duration_seconds", "End-to-end agent turn latency")
+span_duration = Histogram("agent_span_duration_seconds", "Duration of model, tool, AWS and HTTP calls")
+ttft_duration = Histogram("agent_time_to_first_token_seconds", "Time from request to first streamed token")
+tokens_total = Counter("agent_tokens_total", "Model tokens by type")
+errors_total = Counter("agent_errors_total", "Errors by span kind and exception class")
+
+_METRICS = [turn_duration, span_duration, ttft_duration, tokens_total, errors_total]
+
+# Gauge collectors: name -> callable returning a flat stats() dict
+_collectors: Dict[str, Callable[[], Any]] = {}
+
+
+def register_collector(name: str, collect: Callable[[], Any]) -> None:
+    """Export a component's stats() as gauges named agent_<name>_<field>"""
+    _collectors[name] = collect
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every metric and collector"""
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+
+    for name, collect in _collectors.items():
+        try:
+            stats = collect()
+        except Exception as e:
+            logger.warning(f"Metrics collector {name} failed: {e}")
+            continue
+        for field, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f"agent_{name}_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+class Trace:
+    """Spans recorded during one agent turn"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def phase_timings(self) -> Dict[str, Any]:
+        """Compact per-phase breakdown: total time and call count per span kind"""
+        timings: Dict[str, Any] = {"total_ms": round((time.perf_counter() - self.start) * 1000, 1)}
+        with self._lock:
+            for entry in self.spans:
+                kind = entry["kind"]
+                timings[f"{kind}_ms"] = round(timings.get(f"{kind}_ms", 0.0) + entry["duration_ms"], 1)
+                timings[f"{kind}_calls"] = timings.get(f"{kind}_calls", 0) + 1
+        return timings
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("agent_trace", default=None)
+
+
+def record_span(kind: str, name: str, duration_s: float, error: Optional[BaseException] = None,
+                **attributes: Any) -> None:
+    """Record a finished span on the current turn's trace and in the latency histogram"""
+    span_duration.observe(duration_s, kind=kind, name=name)
+    if error is not None:
+        errors_total.inc(kind=kind, error=type(error).__name__)
+
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    entry = {
+        "kind": kind,
+        "name": name,
+        "start_ms": round((time.perf_counter() - duration_s - trace.start) * 1000, 1),
+        "duration_ms": round(duration_s * 1000, 1),
+        **attributes
+    }
+    if error is not None:
+        entry["error"] = type(error).__name__
+    trace.add(entry)
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time a block as a span; the yielded dict can carry extra attributes"""
+    start = time.perf_counter()
+    try:
+        yield attributes
+    except BaseException as e:
+        record_span(kind, name, time.perf_counter() - start, error=e, **attributes)
+        raise
+    record_span(kind, name, time.perf_counter() - start, **attributes)
+
+
+@contextmanager
+def trace_turn(session_id: str) -> Iterator[Trace]:
+    """Collect every span of one agent turn; logs the trace and records turn latency on exit"""
+    trace = Trace(session_id)
+    token = _current_trace.set(trace)
+    status = "success"
+    try:
+        yield trace
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # A streaming generator may be resumed from a different context than it started in
+            _current_trace.set(None)
+        duration = time.perf_counter() - trace.start
+        turn_duration.observe(duration, status=status)
+        if os.getenv("TRACE_LOG", "false").lower() == "true":
+            logger.info(json.dumps({"trace": trace.session_id[:20], "status": status,
+                                    "duration_ms": round(duration * 1000, 1), "spans": trace.spans}))
+
+
+def record_usage(usage: Dict[str, Any]) -> None:
+    """Count a turn's token usage by type"""
+    for field, token_type in (("inputTokens", "input"), ("outputTokens", "output"),
+                              ("cacheReadInputTokens", "cache_read"), ("cacheWriteInputTokens", "cache_write")):
+        if usage.get(field):
+            tokens_total.inc(usage[field], type=token_type)
+
+
+def record_ttft(seconds: float) -> None:
+    ttft_duration.observe(seconds)
+
+
+class TracingHooks(HookProvider):
+    """Strands hooks that turn model and tool calls into spans"""
+
+    def __init__(self):
+        self._model_start: Optional[float] = None
+        self._model_usage: Dict[str, int] = {}
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeModelCallEvent, self._before_model)
+        registry.add_callback(AfterModelCallEvent, self._after_model)
+        registry.add_callback(AfterToolCallEvent, self._after_tool)
+
+    def _before_model(self, event: BeforeModelCallEvent) -> None:
+        # One agent per session and its turns are serialized, so model calls never overlap
+        self._model_start = time.perf_counter()
+        self._model_usage = dict(event.agent.event_loop_metrics.accumulated_usage)
+
+    def _after_model(self, event: AfterModelCallEvent) -> None:
+        if self._model_start is None:
+            return
+        usage = event.agent.event_loop_metrics.accumulated_usage
+        attributes = {
+            field: usage.get(field, 0) - self._model_usage.get(field, 0)
+            for field in ("inputTokens", "outputTokens", "cacheReadInputTokens", "cacheWriteInputTokens")
+            if usage.get(field, 0) - self._model_usage.get(field, 0)
+        }
+        if event.stop_response is not None:
+            attributes["stop_reason"] = event.stop_response.stop_reason
+        record_span("model", getattr(event.agent.model, "config", {}).get("model_id", "model"),
+                    time.perf_counter() - self._model_start, error=event.exception, **attributes)
+        self._model_start = None
+
+    def _after_tool(self, event: AfterToolCallEvent) -> None:
+        status = (event.result or {}).get("status", "success")
+        record_span("tool", event.tool_use["name"], event.duration or 0.0,
+                    error=event.exception, status=status)
+
+
+def _before_aws_call(model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+    context["trace_operation"] = f"{model.service_model.service_name}.{model.name}"
+    context["trace_start"] = time.perf_counter()
+
+
+def _after_aws_call(http_response: Any, parsed: Dict[str, Any], context: Dict[str, Any], **kwargs: Any) -> None:
+    start = context.pop("trace_start", None)
+    if start is None:
+        return
+    attributes = {"status_code": getattr(http_response, "status_code", None)}
+    error_code = (parsed or {}).get("Error", {}).get("Code")
+    if error_code:
+        attributes["error_code"] = error_code
+        errors_total.inc(kind="aws", error=error_code)
+    record_span("aws", context["trace_operation"], time.perf_counter() - start, **attributes)
+
+
+def _after_aws_call_error(exception: Exception, context: Dict[str, Any], **kwargs: Any) -> None:
+    start = context.pop("trace_start", None)
+    if start is not None:
+        record_span("aws", context["trace_operation"], time.perf_counter() - start, error=exception)
+
+
+def instrument_client(client: Any) -> Any:
+    """Record every API call made through a boto3 client as an aws span"""
+    client.meta.events.register("before-call.*.*", _before_aws_call)
+    client.meta.events.register("after-call.*.*", _after_aws_call)
+    client.meta.events.register("after-call-error.*.*", _after_aws_call_error)
+    return client
@@ -0,0 +1,172 @@
+"""
+Speculative tool prefetch: look the raw prompt up while the first model call runs
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Set
+from context_packing import content_terms
+from observability import span
+
+logger = logging.getLogger(__name__)
+
+# Background lookups that are not already asynchronous run here
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PREFETCH_WORKERS', '8')), thread_name_prefix="prefetch")
+
+
+def in_thread(fn: Callable[[str], Any]) -> Callable[[str], Future]:
+    """Adapt a blocking lookup into a prefetch starter"""
+    return lambda query: _executor.submit(fn, query)
+
+
+def _terms(query: str) -> Set[str]:
+    return set(content_terms(query))
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard overlap of the two queries' content words"""
+    terms_a, terms_b = _terms(a), _terms(b)
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / len(terms_a | terms_b)
+
+
+class Prefetch:
+    """One turn's in-flight lookups of the raw prompt, by tool kind"""
+
+    def __init__(self, prompt: str, futures: Dict[str, Future], min_similarity: float):
+        self.prompt = prompt
+        self.futures = futures
+        self.min_similarity = min_similarity
+        self.used: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def match(self, kind: str, query: str) -> Optional[Future]:
+        """The prefetched lookup of this kind if query is close enough to the prompt"""
+        future = self.futures.get(kind)
+        if future is None or future.cancelled() or similarity(query, self.prompt) < self.min_similarity:
+            return None
+        with self._lock:
+            self.used.add(kind)
+        return future
+
+
+_current_prefetch: ContextVar[Optional[Prefetch]] = ContextVar("tool_prefetch", default=None)
+
+
+def prefetched(kind: str, query: str) -> Optional[Future]:
+    """
+    Called by a tool before its own lookup: the current turn's prefetched
+    result future for a closely matching query, or None.
+    """
+    prefetch = _current_prefetch.get()
+    return prefetch.match(kind, query) if prefetch is not None else None
+
+
+def use_prefetched(kind: str, query: str, timeout: float) -> Optional[Any]:
+    """Wait for a matching prefetched lookup; None means look the query up as usual"""
+    future = prefetched(kind, query)
+    if future is None:
+        return None
+    try:
+        with span("prefetch", kind):
+            result = future.result(timeout=timeout)
+        logger.info(f"Prefetch hit ({kind}) for: {query}")
+        return result
+    except Exception as e:
+        logger.warning(f"Prefetched {kind} lookup unusable, querying directly: {e}")
+        return None
+
+
+async def use_prefetched_async(kind: str, query: str, timeout: float) -> Optional[Any]:
+    """use_prefetched() without blocking the event loop"""
+    future = prefetched(kind, query)
+    if future is None:
+        return None
+    try:
+        with span("prefetch", kind):
+            # Shielded: a cancelled tool call must not cancel the shared lookup
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        logger.info(f"Prefetch hit ({kind}) for: {query}")
+        return result
+    except asyncio.CancelledError:
+        if not future.cancelled():
+            raise
+        return None
+    except Exception as e:
+        logger.warning(f"Prefetched {kind} lookup unusable, querying directly: {e}")
+        return None
+
+
+class Prefetcher:
+    """
+    Starts each tool's lookup on the raw prompt when a turn begins and hands
+    the results to tool calls whose queries closely match it.
+
+    Starters are called before the turn's Prefetch is visible to tools, so a
+    prefetched lookup never matches itself. Lookups nothing used are
+    cancelled when the turn ends (a lookup already talking to its backend
+    still completes into the tool cache).
+
+    Args:
+        starters: Tool kind -> function starting a lookup and returning its Future
+        min_similarity: Content-word overlap (0-1) a tool query needs with the prompt
+    """
+
+    def __init__(self, starters: Dict[str, Callable[[str], Future]], min_similarity: Optional[float] = None):
+        self.starters = starters
+        self.min_similarity = (min_similarity if min_similarity is not None
+                               else float(os.getenv('PREFETCH_MIN_SIMILARITY', '0.5')))
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+
+    @contextmanager
+    def turn(self, prompt: str, enabled: bool = True) -> Iterator[Optional[Prefetch]]:
+        """Prefetch for the duration of one turn; yields None when disabled"""
+        if not enabled or not self.starters or not _terms(prompt):
+            yield None
+            return
+
+        futures: Dict[str, Future] = {}
+        for kind, start in self.starters.items():
+            try:
+                futures[kind] = start(prompt)
+            except Exception as e:
+                logger.warning(f"Prefetch {kind} failed to start: {e}")
+
+        prefetch = Prefetch(prompt, futures, self.min_similarity)
+        token = _current_prefetch.set(prefetch)
+        try:
+            yield prefetch
+        finally:
+            try:
+                _current_prefetch.reset(token)
+            except ValueError:
+                # A streaming generator may be resumed from a different context than it started in
+                _current_prefetch.set(None)
+            cancelled = sum(1 for kind, future in futures.items()
+                            if kind not in prefetch.used and future.cancel())
+            with self._lock:
+                self.turns += 1
+                self.started += len(futures)
+                self.used += len(prefetch.used)
+                self.cancelled += cancelled
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "started": self.started,
+                "used": self.used,
+                "unused": self.started - self.used,
+                "cancelled": self.cancelled,
+                "hit_rate": round(self.used / self.started, 3) if self.started else 0.0
+            }
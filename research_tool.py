@@ -0,0 +1,111 @@
+"""
+Combined research tool: fans several queries out to web search and the knowledge base at once
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+from strands import tool
+from tool_cache import normalize_query
+from context_packing import estimate_tokens
+from web_search_tool import format_sources, search_web_async
+from knowledge_base_tool import retrieve_chunks, format_chunks, fuse_chunks
+
+logger = logging.getLogger(__name__)
+
+
+def merge_web_results(responses: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+    """Merge Tavily responses: one answer per query, sources deduplicated by URL"""
+    answers = []
+    sources: Dict[str, Dict[str, Any]] = {}
+
+    for query, data in responses:
+        if data.get('answer'):
+            answers.append((query, data['answer']))
+        for result in data.get('results', []):
+            url = result.get('url') or result.get('title')
+            best = sources.get(url)
+            if best is None or (result.get('score') or 0) > (best.get('score') or 0):
+                sources[url] = result
+
+    ranked = sorted(sources.values(), key=lambda r: r.get('score') or 0, reverse=True)
+    return {'answers': answers, 'results': ranked}
+
+
+def format_research(web: Dict[str, Any], chunks: List[Dict[str, Any]], errors: List[str], query: str) -> str:
+    """Render merged web and KB findings as one tool result, each packed into its own token budget"""
+    sections = []
+
+    if web['answers'] or web['results']:
+        lines = ["## Web"]
+        for q, answer in web['answers']:
+            lines.append(f"**Answer ({q}):** {answer}")
+        budget = int(os.getenv('RESEARCH_WEB_TOKEN_BUDGET', '1000')) - estimate_tokens("\n".join(lines))
+        sources = format_sources(web['results'][:int(os.getenv('RESEARCH_MAX_WEB_RESULTS', '10'))], query, budget)
+        if sources:
+            lines.append("**Sources:**")
+            lines.extend(sources)
+        sections.append("\n".join(lines))
+
+    if chunks:
+        budget = int(os.getenv('KB_TOKEN_BUDGET', '1500'))
+        sections.append("## Knowledge base\n" + format_chunks(chunks, budget, query))
+
+    if errors:
+        sections.append("## Unavailable\n" + "\n".join(errors))
+
+    return "\n\n".join(sections) if sections else "No relevant information found."
+
+
+async def _web_lookup(query: str) -> Tuple[str, Dict[str, Any]]:
+    return query, await search_web_async(query)
+
+
+@tool
+async def research(queries: List[str]) -> str:
+    """
+    Research a topic by searching the web and the company knowledge base in parallel.
+    Use this for complex topics that need both current and internal information, or
+    several related queries at once. Results are merged and deduplicated.
+
+    Args:
+        queries: One to four search queries covering different angles of the topic
+
+    Returns:
+        Combined web and knowledge base findings
+    """
+    # Queries that normalize to the same cache key would only repeat each other
+    unique: Dict[str, str] = {}
+    for query in queries:
+        if normalize_query(query):
+            unique.setdefault(normalize_query(query), query.strip())
+    queries = list(unique.values())[:int(os.getenv('RESEARCH_MAX_QUERIES', '4'))]
+    if not queries:
+        return "No queries given."
+
+    use_web = bool(os.getenv('TAVILY_API_KEY'))
+    use_kb = bool(os.getenv('KNOWLEDGE_BASE_ID') or os.getenv('KB_LOCAL_INDEX'))
+    if not use_web and not use_kb:
+        return "Research is not available (no web search API key or knowledge base configured)."
+    web_tasks = [_web_lookup(q) for q in queries] if use_web else []
+    kb_tasks = [asyncio.to_thread(retrieve_chunks, q) for q in queries] if use_kb else []
+
+    sources = " and ".join(name for name, used in (("web", use_web), ("knowledge base", use_kb)) if used)
+    logger.info(f"Researching {len(queries)} queries across {sources}")
+    outcomes = await asyncio.gather(*web_tasks, *kb_tasks, return_exceptions=True)
+    web_outcomes, kb_outcomes = outcomes[:len(web_tasks)], outcomes[len(web_tasks):]
+
+    errors = []
+    for query, outcome in zip(queries, web_outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Tavily search error: {outcome}")
+            errors.append(f"Web search failed for '{query}': {outcome}")
+    for query, outcome in zip(queries, kb_outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Knowledge base search error: {outcome}")
+            errors.append(f"Knowledge search failed for '{query}': {outcome}")
+
+    web = merge_web_results([o for o in web_outcomes if not isinstance(o, Exception)])
+    chunks = fuse_chunks([o for o in kb_outcomes if not isinstance(o, Exception)])
+    return format_research(web, chunks, errors, " ".join(queries))
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Multi-process serving: N agent.py workers behind one /invocations and /ping front end
+
+Each worker is a full agent.py runtime on a private port. The front end
+routes every request by its session_id with rendezvous hashing, so a
+session's agent and conversation stay on one worker, and only the sessions
+of a worker that goes down move to the others. Workers that exit are
+restarted. Admin actions ({"action": ...}) go to every worker. No outside
+services are involved: workers share tool results through the disk cache
+(TOOL_CACHE_DISK_PATH), which defaults to a file in the temp directory here.
+
+    SERVE_WORKERS=4 python serve.py
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import hashlib
+import logging
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+import aiohttp
+from aiohttp import web
+
+# Load environment variables
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+# Same header the AgentCore runtime uses; the payload's session_id takes precedence, as in agent.py
+SESSION_HEADER = "X-Amzn-Bedrock-AgentCore-Runtime-Session-Id"
+# Not forwarded: they describe the front end's own connection
+HOP_HEADERS = frozenset(("host", "connection", "keep-alive", "content-length", "transfer-encoding", "upgrade"))
+
+
+def rendezvous_score(worker_id: int, session_id: str) -> int:
+    """Highest-random-weight hash of a session on a worker"""
+    digest = hashlib.blake2b(f"{worker_id}:{session_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class Worker:
+    """One agent.py process on a private port"""
+
+    def __init__(self, worker_id: int, port: int):
+        self.id = worker_id
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.process: Optional[subprocess.Popen] = None
+        self.up = False
+        self.restarts = 0
+        self.requests = 0
+
+    def start(self) -> None:
+        env = dict(os.environ, AGENT_PORT=str(self.port), AGENT_HOST="127.0.0.1", AGENT_WORKER_ID=str(self.id))
+        self.process = subprocess.Popen([sys.executable, "agent.py"], env=env,
+                                        cwd=os.path.dirname(os.path.abspath(__file__)))
+        logger.info(f"Worker {self.id} started (pid {self.process.pid}, port {self.port})")
+
+    def exited(self) -> bool:
+        return self.process is None or self.process.poll() is not None
+
+    def stop(self) -> None:
+        self.up = False
+        if not self.exited():
+            self.process.terminate()
+
+
+class WorkerPool:
+    """
+    Starts, health-checks and restarts the workers, and picks one per session.
+
+    Args:
+        count: Worker processes (SERVE_WORKERS, default one per CPU)
+        base_port: First worker port; worker i listens on base_port + i
+        start_timeout: Seconds a worker may take to answer /ping after starting
+    """
+
+    def __init__(self, count: int, base_port: int, start_timeout: float):
+        self.workers = [Worker(i, base_port + i) for i in range(count)]
+        self.start_timeout = start_timeout
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def start(self) -> None:
+        """Start every worker and return once all answer /ping"""
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=0, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=5)
+        )
+        for worker in self.workers:
+            worker.start()
+        await asyncio.gather(*(self._wait_ready(worker) for worker in self.workers))
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _wait_ready(self, worker: Worker) -> None:
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline:
+            if worker.exited():
+                raise RuntimeError(f"Worker {worker.id} exited with code {worker.process.returncode} during startup")
+            if await self._answers_ping(worker):
+                worker.up = True
+                logger.info(f"Worker {worker.id} ready")
+                return
+            await asyncio.sleep(0.25)
+        raise RuntimeError(f"Worker {worker.id} did not answer /ping within {self.start_timeout:.0f}s")
+
+    async def _answers_ping(self, worker: Worker) -> bool:
+        try:
+            async with self.session.get(worker.url + "/ping", timeout=aiohttp.ClientTimeout(total=1)) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def _recover(self, worker: Worker) -> None:
+        """Put a running worker that refused a connection back in rotation once it answers /ping"""
+        if await self._answers_ping(worker) and not worker.exited():
+            worker.up = True
+            logger.info(f"Worker {worker.id} answering again, back in rotation")
+
+    async def _supervise(self) -> None:
+        """
+        Restart workers that exit, and recheck running workers marked down after a refused
+        connection; their sessions hash to the others until they are back
+        """
+        while not self._stopping:
+            await asyncio.sleep(1)
+            await asyncio.gather(*(self._recover(w) for w in self.workers if not w.up and not w.exited()))
+            for worker in self.workers:
+                if worker.exited() and not self._stopping:
+                    worker.up = False
+                    worker.restarts += 1
+                    logger.warning(f"Worker {worker.id} exited with code {worker.process.returncode}, restarting")
+                    worker.start()
+                    try:
+                        await self._wait_ready(worker)
+                    except RuntimeError as e:
+                        logger.error(str(e))
+
+    def pick(self, session_id: str, exclude: Optional[set] = None) -> Optional[Worker]:
+        """The live worker with the highest rendezvous score for the session"""
+        candidates = [w for w in self.workers if w.up and w.id not in (exclude or ())]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda w: rendezvous_score(w.id, session_id))
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        for worker in self.workers:
+            worker.stop()
+        deadline = time.monotonic() + 10
+        for worker in self.workers:
+            while not worker.exited() and time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+            if not worker.exited():
+                worker.process.kill()
+        if self.session is not None:
+            await self.session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"workers": len(self.workers),
+                                 "workers_up": sum(1 for w in self.workers if w.up),
+                                 "restarts": sum(w.restarts for w in self.workers)}
+        for worker in self.workers:
+            stats[f"worker_{worker.id}_requests"] = worker.requests
+        return stats
+
+
+def _forward_headers(request: web.Request) -> Dict[str, str]:
+    return {k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS}
+
+
+async def _relay(request: web.Request, response: aiohttp.ClientResponse) -> web.StreamResponse:
+    """Pass a worker's response through; event streams are relayed chunk by chunk"""
+    content_type = response.headers.get("Content-Type", "application/json")
+    if "text/event-stream" not in content_type:
+        return web.Response(status=response.status, body=await response.read(),
+                            headers={"Content-Type": content_type})
+
+    relayed = web.StreamResponse(status=response.status, headers={"Content-Type": content_type,
+                                                                  "Cache-Control": "no-cache"})
+    await relayed.prepare(request)
+    async for chunk in response.content.iter_any():
+        await relayed.write(chunk)
+    await relayed.write_eof()
+    return relayed
+
+
+async def _broadcast(pool: WorkerPool, request: web.Request, body: bytes, action: str) -> web.Response:
+    """Admin actions apply to every worker; the reply lists each worker's answer"""
+
+    async def send(worker: Worker) -> Dict[str, Any]:
+        try:
+            async with pool.session.post(worker.url + "/invocations", data=body,
+                                         headers=_forward_headers(request)) as response:
+                return {"worker": worker.id, **await response.json(content_type=None)}
+        except (aiohttp.ClientError, ValueError) as e:
+            return {"worker": worker.id, "status": "error", "error": str(e)}
+
+    results = await asyncio.gather(*(send(w) for w in pool.workers if w.up))
+    status = "success" if results and all(r.get("status") == "success" for r in results) else "error"
+    return web.json_response({"action": action, "workers": results, "status": status})
+
+
+async def invocations(request: web.Request) -> web.StreamResponse:
+    pool: WorkerPool = request.app["pool"]
+    body = await request.read()
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        return web.json_response({"error": "Invalid JSON payload", "status": "error"}, status=400)
+    if not isinstance(payload, dict):
+        payload = {}
+
+    if payload.get("action"):
+        return await _broadcast(pool, request, body, payload["action"])
+
+    session_id = payload.get("session_id") or request.headers.get(SESSION_HEADER) or "default-session"
+    tried: set = set()
+    # A worker that refuses the connection never saw the request, so the next choice can take it
+    while True:
+        worker = pool.pick(session_id, exclude=tried)
+        if worker is None:
+            return web.json_response({"error": "No healthy workers", "session_id": session_id,
+                                      "status": "error"}, status=503)
+        tried.add(worker.id)
+        worker.requests += 1
+        try:
+            async with pool.session.post(worker.url + "/invocations", data=body,
+                                         headers=_forward_headers(request)) as response:
+                return await _relay(request, response)
+        except aiohttp.ClientConnectorError as e:
+            logger.warning(f"Worker {worker.id} unreachable, rerouting session {session_id[:20]}: {e}")
+            worker.up = False
+
+
+async def ping(request: web.Request) -> web.Response:
+    """Healthy while any worker is; HealthyBusy if any live worker reports busy"""
+    pool: WorkerPool = request.app["pool"]
+
+    async def status(worker: Worker) -> Optional[Dict[str, Any]]:
+        try:
+            async with pool.session.get(worker.url + "/ping", timeout=aiohttp.ClientTimeout(total=2)) as response:
+                return await response.json(content_type=None) if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            return None
+
+    statuses = [s for s in await asyncio.gather(*(status(w) for w in pool.workers if w.up)) if s]
+    if not statuses:
+        return web.json_response({"status": "Unhealthy"}, status=503)
+    busy = any(s.get("status") == "HealthyBusy" for s in statuses)
+    return web.json_response({
+        "status": "HealthyBusy" if busy else "Healthy",
+        "time_of_last_update": max(s.get("time_of_last_update", 0) for s in statuses)
+    })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Front-end gauges; ?worker=N returns that worker's own /metrics"""
+    pool: WorkerPool = request.app["pool"]
+    if "worker" in request.query:
+        try:
+            worker = pool.workers[int(request.query["worker"])]
+            async with pool.session.get(worker.url + "/metrics") as response:
+                return web.Response(status=response.status, body=await response.read(),
+                                    headers={"Content-Type": response.headers.get("Content-Type", "text/plain")})
+        except (ValueError, IndexError):
+            return web.Response(status=404, text="unknown worker\n")
+        except aiohttp.ClientError as e:
+            return web.Response(status=502, text=f"worker unreachable: {e}\n")
+
+    lines: List[str] = []
+    for field, value in pool.stats().items():
+        lines.append(f"# TYPE agent_serve_{field} gauge")
+        lines.append(f"agent_serve_{field} {value}")
+    return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+
+def build_app(pool: WorkerPool) -> web.Application:
+    app = web.Application(client_max_size=int(os.getenv("SERVE_MAX_BODY_BYTES", str(10 * 1024 * 1024))))
+    app["pool"] = pool
+    app.router.add_post("/invocations", invocations)
+    app.router.add_get("/ping", ping)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+
+async def main_async() -> None:
+    count = int(os.getenv("SERVE_WORKERS", str(os.cpu_count() or 1)))
+    port = int(os.getenv("AGENT_PORT", "8080"))
+    in_docker = os.path.exists("/.dockerenv") or os.getenv("DOCKER_CONTAINER")
+    host = os.getenv("AGENT_HOST") or ("0.0.0.0" if in_docker else "127.0.0.1")
+    # Workers share cached tool results instead of each warming its own cache
+    os.environ.setdefault("TOOL_CACHE_DISK_PATH", os.path.join(tempfile.gettempdir(), "agent-tool-cache.db"))
+
+    pool = WorkerPool(count, int(os.getenv("SERVE_WORKER_BASE_PORT", str(port + 1000))),
+                      float(os.getenv("SERVE_WORKER_START_TIMEOUT", "120")))
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info(f"Starting {count} agent workers...")
+    start = time.perf_counter()
+    try:
+        # Like agent.py, the front end only binds once every worker is warm, so /ping means ready
+        await pool.start()
+        runner = web.AppRunner(build_app(pool), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Serving {count} workers on {host}:{port} (ready in {time.perf_counter() - start:.1f}s)")
+        await stop.wait()
+        await runner.cleanup()
+    finally:
+        logger.info("Stopping workers...")
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async())
@@ -0,0 +1,170 @@
+"""
+Session-keyed pool of Strands agents with LRU, idle TTL and memory-based eviction
+"""
+
+import gc
+import os
+import time
+import logging
+import resource
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Peak RSS (KB on Linux) is the best we can do without /proc
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _Slot:
+    """One session's agent plus the lock that serializes its turns"""
+
+    __slots__ = ('agent', 'lock', 'users', 'last_used')
+
+    def __init__(self):
+        self.agent: Any = None
+        self.lock = threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class AgentPool:
+    """
+    Keeps one agent (and so one conversation history) per session.
+
+    Turns for the same session run one at a time; different sessions run in
+    parallel. Idle sessions are evicted after idle_ttl seconds, the least
+    recently used ones past max_sessions, and the oldest idle quarter when
+    process RSS exceeds max_rss_mb. CPython seldom returns freed memory to the
+    OS, so RSS can stay over the cap after a shed; the next shed waits at least
+    rss_cooldown seconds instead of clearing histories on every turn. Sessions
+    with a turn in flight are never evicted.
+    """
+
+    def __init__(self, factory: Callable[[], Any], max_sessions: Optional[int] = None,
+                 idle_ttl: Optional[float] = None, max_rss_mb: Optional[float] = None,
+                 rss_cooldown: Optional[float] = None):
+        self._factory = factory
+        self.max_sessions = max_sessions or int(os.getenv('AGENT_POOL_MAX_SESSIONS', '256'))
+        self.idle_ttl = idle_ttl or float(os.getenv('AGENT_POOL_IDLE_TTL', '1800'))
+        self.max_rss_mb = max_rss_mb or float(os.getenv('AGENT_POOL_MAX_RSS_MB', '1536'))
+        self.rss_cooldown = (rss_cooldown if rss_cooldown is not None
+                             else float(os.getenv('AGENT_POOL_RSS_COOLDOWN', '60')))
+        self._rss_shed_at = float('-inf')
+        self._slots: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.rss_sheds = 0
+
+    def checkout(self, session_id: str) -> Any:
+        """Return the session's agent, blocking while another turn of the same session runs"""
+        with self._lock:
+            slot = self._slots.get(session_id)
+            if slot is None:
+                slot = self._slots[session_id] = _Slot()
+            self._slots.move_to_end(session_id)
+            slot.users += 1
+
+        slot.lock.acquire()
+        if slot.agent is None:
+            try:
+                slot.agent = self._factory()
+                with self._lock:
+                    self.created += 1
+            except Exception:
+                self._release_slot(session_id, slot)
+                raise
+        return slot.agent
+
+    def release(self, session_id: str) -> None:
+        """Hand the session's agent back and run eviction"""
+        with self._lock:
+            slot = self._slots.get(session_id)
+        if slot is not None:
+            self._release_slot(session_id, slot)
+        self.evict()
+
+    def _release_slot(self, session_id: str, slot: _Slot) -> None:
+        with self._lock:
+            slot.users -= 1
+            slot.last_used = time.monotonic()
+        slot.lock.release()
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Any]:
+        """Context manager around checkout()/release()"""
+        agent = self.checkout(session_id)
+        try:
+            yield agent
+        finally:
+            self.release(session_id)
+
+    def peek(self, session_id: str) -> Optional[Any]:
+        """Return the session's agent if it exists, without checking it out"""
+        with self._lock:
+            slot = self._slots.get(session_id)
+            return slot.agent if slot is not None else None
+
+    def evict(self) -> int:
+        """Apply the idle TTL, LRU bound and memory cap; returns sessions evicted"""
+        now = time.monotonic()
+        evicted = 0
+
+        with self._lock:
+            for session_id, slot in list(self._slots.items()):
+                if slot.users == 0 and now - slot.last_used > self.idle_ttl:
+                    del self._slots[session_id]
+                    evicted += 1
+
+            overflow = len(self._slots) - self.max_sessions
+            for session_id, slot in list(self._slots.items()):
+                if overflow <= 0:
+                    break
+                if slot.users == 0:
+                    del self._slots[session_id]
+                    overflow -= 1
+                    evicted += 1
+
+        if now - self._rss_shed_at >= self.rss_cooldown and current_rss_mb() > self.max_rss_mb:
+            shed = 0
+            with self._lock:
+                # Another release may have shed while this one read RSS
+                if now - self._rss_shed_at >= self.rss_cooldown:
+                    self._rss_shed_at = now
+                    idle = [sid for sid, slot in self._slots.items() if slot.users == 0]
+                    # Freed memory shows up in RSS lazily, so shed a batch rather than looping to the cap
+                    for session_id in idle[:max(1, len(idle) // 4)]:
+                        del self._slots[session_id]
+                        shed += 1
+                    self.rss_sheds += 1
+            if shed:
+                evicted += shed
+                gc.collect()
+
+        if evicted:
+            self.evicted += evicted
+            logger.info(f"Evicted {evicted} idle agent session(s), {len(self._slots)} resident")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = sum(1 for slot in self._slots.values() if slot.users)
+            return {
+                "sessions": len(self._slots),
+                "active": active,
+                "created": self.created,
+                "evicted": self.evicted,
+                "rss_sheds": self.rss_sheds,
+                "rss_mb": round(current_rss_mb(), 1)
+            }
@@ -0,0 +1,118 @@
+"""
+Request coalescing: at most one upstream call in flight per key, shared by every concurrent caller
+"""
+
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key (the leader) runs the call; callers arriving while
+    it is in flight wait for its result or exception instead of issuing their own.
+    Each waiter applies its own timeout, and a waiter timing out never cancels the
+    shared call. Works across threads and across event loops, because the shared
+    result is a concurrent.futures.Future.
+
+    With a loop (a callable returning a long-lived event loop), do_async()
+    runs each leader's coroutine there rather than on the leader's own loop,
+    which may be torn down while other loops' waiters still need the result.
+    A leader cancelled regardless fails its waiters with RuntimeError, so they
+    see an ordinary error rather than a CancelledError of their own.
+    """
+
+    def __init__(self, name: str, loop: Optional[Callable[[], asyncio.AbstractEventLoop]] = None):
+        self.name = name
+        self._loop = loop
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether this caller is its leader"""
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+
+            future = Future()
+            # A running future cannot be cancelled, so one waiter giving up never affects the others
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.upstream_calls += 1
+            return future, True
+
+    def _settle(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        # Forget the key first so callers arriving from now on start a fresh call
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """Run fn() once per key across concurrent threads; waiters block up to timeout seconds"""
+        future, leader = self._join(key)
+        if not leader:
+            logger.debug(f"{self.name}: joined in-flight call for {key}")
+            return future.result(timeout=timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    async def do_async(self, key: str, coro_fn: Callable[[], Awaitable[Any]],
+                       timeout: Optional[float] = None) -> Any:
+        """Await coro_fn() once per key across concurrent tasks, threads and loops"""
+        future, leader = self._join(key)
+        if leader:
+            def _done(task: "asyncio.Future[Any]") -> None:
+                if task.cancelled():
+                    self._settle(key, future, error=RuntimeError(f"{self.name}: shared call for {key} was cancelled"))
+                elif task.exception() is not None:
+                    self._settle(key, future, error=task.exception())
+                else:
+                    self._settle(key, future, result=task.result())
+
+            def _start(coro: Awaitable[Any], context: contextvars.Context) -> None:
+                loop.create_task(coro, context=context).add_done_callback(_done)
+
+            loop = self._loop() if self._loop is not None else asyncio.get_running_loop()
+            # The caller's context goes along, so spans still land on the caller's trace
+            loop.call_soon_threadsafe(_start, coro_fn(), contextvars.copy_context())
+        else:
+            logger.debug(f"{self.name}: joined in-flight call for {key}")
+
+        shared = asyncio.wrap_future(future)
+        # After a timeout nobody reads the outcome here; retrieve it so a failure is not logged as lost
+        shared.add_done_callback(lambda f: f.cancelled() or f.exception())
+        # Shielded so this caller's timeout or cancellation leaves the shared call running
+        return await asyncio.wait_for(asyncio.shield(shared), timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "in_flight": len(self._calls),
+                "calls": self.calls,
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced
+            }
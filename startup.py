@@ -0,0 +1,123 @@
+"""
+Startup profiling and pre-warming: time from process start to ready, by phase
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Imported first by agent.py, so this is as close to interpreter start as module code gets
+_T0 = time.perf_counter()
+_last_mark = _T0
+_phases: Dict[str, float] = {}
+_prewarm: Dict[str, Any] = {}
+_lock = threading.Lock()
+_ready_ms: Optional[float] = None
+
+
+def _interpreter_ms() -> Optional[float]:
+    """Milliseconds between process start and this module being imported (Linux only)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Field 22 is the start time in clock ticks after boot; the name field may contain spaces
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        age = uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+        return round((age - (time.perf_counter() - _T0)) * 1000, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+_INTERPRETER_MS = _interpreter_ms()
+
+
+def mark(phase: str) -> None:
+    """Close the current phase: time since the previous mark is booked under phase"""
+    global _last_mark
+    now = time.perf_counter()
+    with _lock:
+        _phases[phase] = round((now - _last_mark) * 1000, 1)
+        _last_mark = now
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as its own phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        global _last_mark
+        with _lock:
+            _phases[name] = round((time.perf_counter() - start) * 1000, 1)
+            _last_mark = time.perf_counter()
+
+
+def prewarm(tasks: Dict[str, Callable[[], Any]], timeout: Optional[float] = None) -> None:
+    """
+    Run warm-up tasks concurrently, bounded by timeout seconds. A failing or
+    slow task is logged and skipped: pre-warming must never block readiness for good.
+    """
+    timeout = timeout if timeout is not None else float(os.getenv('STARTUP_PREWARM_TIMEOUT', '20'))
+
+    def timed(name: str, task: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        try:
+            task()
+            result: Any = round((time.perf_counter() - start) * 1000, 1)
+        except Exception as e:
+            logger.warning(f"Pre-warm step {name} failed: {e}")
+            result = f"failed: {type(e).__name__}"
+        with _lock:
+            _prewarm[name] = result
+
+    with phase("prewarm"):
+        executor = ThreadPoolExecutor(max_workers=len(tasks) or 1, thread_name_prefix="prewarm")
+        futures = [executor.submit(timed, name, task) for name, task in tasks.items()]
+        _, pending = wait(futures, timeout=timeout)
+        if pending:
+            logger.warning(f"Pre-warm timed out after {timeout:.0f}s with {len(pending)} step(s) still running")
+        executor.shutdown(wait=False)
+
+
+def ready() -> Dict[str, Any]:
+    """Record the process as ready to serve, log the startup report and return it"""
+    global _ready_ms
+    _ready_ms = round((time.perf_counter() - _T0) * 1000, 1)
+    startup = report()
+    logger.info(f"Startup report: {startup}")
+    return startup
+
+
+def report() -> Dict[str, Any]:
+    """Phase timings (ms): interpreter start, each marked phase, pre-warm steps, start-to-ready"""
+    with _lock:
+        result: Dict[str, Any] = {
+            "interpreter_ms": _INTERPRETER_MS,
+            "phases": dict(_phases),
+            "prewarm": dict(_prewarm),
+            "ready_ms": _ready_ms,
+        }
+    if _ready_ms is not None and _INTERPRETER_MS is not None:
+        result["start_to_ready_ms"] = round(_INTERPRETER_MS + _ready_ms, 1)
+    return result
+
+
+def summary() -> Dict[str, float]:
+    """Flat numeric view of report() for metrics gauges"""
+    startup = report()
+    flat = {f"{name}_ms": value for name, value in startup["phases"].items()}
+    # Failed pre-warm steps carry a string and are left out
+    flat.update({f"prewarm_{name}_ms": value for name, value in startup["prewarm"].items()
+                 if isinstance(value, float)})
+    for field in ("interpreter_ms", "ready_ms", "start_to_ready_ms"):
+        if startup.get(field) is not None:
+            flat[field] = startup[field]
+    return flat
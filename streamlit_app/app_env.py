@@ -4,10 +4,8 @@ import boto3
 import json
 import os
 from dotenv import load_dotenv
-import hmac
-import hashlib
-import base64
 import time
+from cognito_auth import AuthError, CognitoAuth, TokenStore
 
 # Load environment variables
 load_dotenv()
@@ -24,68 +22,74 @@ if 'authenticated' not in st.session_state:
 if 'user_email' not in st.session_state:
     st.session_state.user_email = None
 
+@st.cache_resource
+def get_auth():
+    """Create the Cognito client and JWKS cache once and reuse them across reruns
+
+    Raises AuthError for a malformed pool or client id; nothing is cached then, so a fixed .env applies on rerun.
+    """
+    return CognitoAuth(os.getenv('COGNITO_USER_POOL_ID', ''), os.getenv('COGNITO_CLIENT_ID', ''),
+                       client_secret=os.getenv('COGNITO_CLIENT_SECRET') or None)
+
+@st.cache_resource
+def get_token_store():
+    """Signed-in sessions, shared by every browser tab this server process serves"""
+    return TokenStore()
+
 def check_persistent_session():
-    """Check if user has a valid persistent session"""
+    """Restore the signed-in session named by the URL's auth_token, refreshing its tokens when near expiry
+    
+    Runs on every rerun. It costs a dictionary lookup unless the access token is about to
+    expire, in which case it makes one refresh call instead of asking the user to log in again.
+    """
+    key = st.query_params.get('auth_token')
+    session = get_token_store().get(key)
+    if session is None:
+        return False
+    
     try:
-        # Check for auth token in query params (simple persistent session)
-        query_params = st.query_params
-        if 'auth_token' in query_params:
-            token = query_params['auth_token']
-            # Simple token validation (in production, use proper JWT validation)
-            if token and len(token) > 20:  # Basic validation
-                stored_email = query_params.get('user', '')
-                if stored_email:
-                    st.session_state.authenticated = True
-                    st.session_state.user_email = stored_email
-                    return True
-    except:
-        pass
-    return False
-
-def set_persistent_session(email):
-    """Set persistent session by updating URL params"""
-    # Generate simple auth token (in production, use proper JWT)
-    auth_token = base64.b64encode(f"{email}:{int(time.time())}".encode()).decode()
+        auth = get_auth()
+    except AuthError as e:
+        # Misconfigured user pool or client: show it on the login form instead of crashing the page
+        st.session_state.auth_error = str(e)
+        return False
+    try:
+        fresh = auth.ensure_fresh(session)
+    except AuthError as e:
+        # Refresh token expired or revoked: only now does the user have to log in again
+        st.session_state.auth_error = f"Session expired, please log in again ({e})"
+        clear_persistent_session()
+        return False
+    if fresh is not session:
+        get_token_store().update(key, fresh)
     
-    # Update URL with auth parameters
-    st.query_params.auth_token = auth_token
-    st.query_params.user = email
+    st.session_state.authenticated = True
+    st.session_state.user_email = fresh['email']
+    return True
+
+def set_persistent_session(session):
+    """Keep the tokens server-side and put only their opaque store key in the URL"""
+    st.query_params.clear()
+    st.query_params.auth_token = get_token_store().put(session)
     
 def clear_persistent_session():
     """Clear persistent session"""
+    get_token_store().remove(st.query_params.get('auth_token'))
     st.query_params.clear()
 
-def get_secret_hash(username, client_id, client_secret):
-    """Generate secret hash for Cognito authentication"""
-    message = username + client_id
-    dig = hmac.new(client_secret.encode('UTF-8'), message.encode('UTF-8'), hashlib.sha256).digest()
-    return base64.b64encode(dig).decode()
-
 def authenticate_user(username, password):
-    """Authenticate user with Cognito"""
+    """Authenticate user with Cognito; returns the verified token session on success"""
     try:
-        client = boto3.client('cognito-idp', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        
-        response = client.initiate_auth(
-            ClientId=os.getenv('COGNITO_CLIENT_ID'),
-            AuthFlow='USER_PASSWORD_AUTH',
-            AuthParameters={
-                'USERNAME': username,
-                'PASSWORD': password
-            }
-        )
-        
-        if response.get('AuthenticationResult'):
-            return True, response['AuthenticationResult']
-        return False, None
-        
-    except Exception as e:
+        return True, get_auth().sign_in(username, password)
+    except AuthError as e:
         return False, str(e)
 
 def login_form():
     """Display login form"""
     st.title("🔐 Login Required")
     st.write("Please authenticate to access the AI Agent")
+    if st.session_state.get('auth_error'):
+        st.warning(st.session_state.pop('auth_error'))
     
     with st.form("login_form"):
         username = st.text_input("Email", placeholder="Enter your email")
@@ -102,8 +106,8 @@ def login_form():
                     st.session_state.session_id = f"session-{str(uuid.uuid4())}"
                     st.session_state.messages = []  # Fresh conversation history
                     st.session_state.authenticated = True
-                    st.session_state.user_email = username
-                    set_persistent_session(username)
+                    st.session_state.user_email = result['email']
+                    set_persistent_session(result)
                     st.success("✅ Authentication successful!")
                     st.rerun()
                 else:
@@ -111,8 +115,9 @@ def login_form():
             else:
                 st.error("Please enter both email and password")
 
+@st.cache_resource
 def get_aws_client():
-    """Create AWS client using environment variables"""
+    """Create the AgentCore runtime client once and reuse it across reruns"""
     aws_profile = os.getenv('AWS_PROFILE')
     aws_region = os.getenv('AWS_REGION', 'us-east-1')
     
@@ -122,48 +127,87 @@ def get_aws_client():
     
     return boto3.client('bedrock-agentcore', region_name=aws_region)
 
-def call_agent(prompt, session_id):
-    """Call the deployed Strands agent"""
+def extract_text(response_data):
+    """Pull the assistant text out of a runtime JSON response"""
+    if response_data.get('status') != 'success':
+        return f"Error: {response_data.get('error', 'unknown error')}"
+    
+    content = response_data.get('response', {}).get('content') or [{}]
+    text = content[0].get('text')
+    
+    # Strands returns the whole assistant message object as the text field
+    if isinstance(text, dict):
+        text = "".join(block.get('text', '') for block in text.get('content', []))
+    
+    return text or "Failed to extract text from response"
+
+def stream_agent(prompt, session_id, timings, user_id=None):
+    """Call the deployed Strands agent and yield response text as it arrives
+    
+    Fills timings with ttfb_ms (first response byte) and total_ms.
+    """
+    start = time.perf_counter()
+    
+    def elapsed_ms():
+        return round((time.perf_counter() - start) * 1000)
+    
     try:
         agent_runtime_arn = os.getenv('AGENT_RUNTIME_ARN')
         if not agent_runtime_arn:
-            return "Error: AGENT_RUNTIME_ARN environment variable not set"
+            yield "Error: AGENT_RUNTIME_ARN environment variable not set"
+            return
         
         client = get_aws_client()
         
-        payload = json.dumps({"prompt": prompt, "session_id": session_id})
+        # user_id lets the runtime schedule queued turns fairly per user rather than per session
+        payload = json.dumps({"prompt": prompt, "session_id": session_id, "user_id": user_id, "stream": True})
         
         response = client.invoke_agent_runtime(
             agentRuntimeArn=agent_runtime_arn,
             runtimeSessionId=session_id,
             payload=payload
         )
+        body = response['response']
         
-        response_body = response['response'].read()
-        response_data = json.loads(response_body)
-        
-        if (response_data.get('status') == 'success' and
-            'response' in response_data and
-            'content' in response_data['response'] and
-            len(response_data['response']['content']) > 0 and
-            'text' in response_data['response']['content'][0] and
-            isinstance(response_data['response']['content'][0]['text'], dict) and
-            'content' in response_data['response']['content'][0]['text'] and
-            len(response_data['response']['content'][0]['text']['content']) > 0 and
-            'text' in response_data['response']['content'][0]['text']['content'][0]):
-            
-            return response_data['response']['content'][0]['text']['content'][0]['text']
-        
-        return "Failed to extract text from deeply nested response"
+        if 'text/event-stream' in response.get('contentType', ''):
+            # Server-sent events: one "data: {json}" line per event, read incrementally
+            streamed = False
+            for line in body.iter_lines():
+                timings.setdefault('ttfb_ms', elapsed_ms())
+                if not line.startswith(b'data: '):
+                    continue
+                
+                event = json.loads(line[len(b'data: '):])
+                if event.get('type') == 'text':
+                    streamed = True
+                    yield event['delta']
+                elif event.get('type') == 'final' and not streamed:
+                    yield extract_text(event)
+                elif 'error' in event:
+                    yield f"\n\nError: {event['error']}"
+        else:
+            # Plain JSON body (non-streaming runtime); it has to be complete to parse
+            chunks = []
+            for chunk in body.iter_chunks():
+                timings.setdefault('ttfb_ms', elapsed_ms())
+                chunks.append(chunk)
+            yield extract_text(json.loads(b''.join(chunks)))
             
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
+    finally:
+        timings['total_ms'] = elapsed_ms()
+
+def format_timings(timings):
+    """Render the per-message latency indicator"""
+    ttfb = timings.get('ttfb_ms')
+    ttfb_text = f"{ttfb / 1000:.2f}s" if ttfb is not None else "n/a"
+    return f"⏱️ First byte {ttfb_text} · Total {timings.get('total_ms', 0) / 1000:.2f}s"
 
 def main():
-    # Check for persistent session first
-    if not st.session_state.authenticated:
-        if check_persistent_session():
-            st.rerun()
+    # Every rerun re-checks the stored session: locally, unless its tokens need a refresh
+    if not check_persistent_session():
+        st.session_state.authenticated = False
     
     # Check authentication
     if not st.session_state.authenticated:
@@ -209,21 +253,24 @@ def main():
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.write(message["content"])
+            if message.get("timings"):
+                st.caption(format_timings(message["timings"]))
     
     # Chat input
     if prompt := st.chat_input("Ask me anything..."):
         # Add user message to session state
         st.session_state.messages.append({"role": "user", "content": prompt})
+        with st.chat_message("user"):
+            st.write(prompt)
         
-        # Get agent response
-        with st.spinner("Thinking..."):
-            response = call_agent(prompt, st.session_state.session_id)
+        # Render the agent response token by token as it arrives
+        timings = {}
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_agent(prompt, st.session_state.session_id, timings, st.session_state.user_email))
+            st.caption(format_timings(timings))
         
         # Add assistant response to session state
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        
-        # Rerun to display the new messages
-        st.rerun()
+        st.session_state.messages.append({"role": "assistant", "content": response, "timings": timings})
 
 if __name__ == "__main__":
     main()
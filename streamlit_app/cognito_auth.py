@@ -0,0 +1,197 @@
+"""
+Cognito sign-in for the Streamlit app: tokens verified locally against the
+user pool's cached JWKS, silent refresh before expiry, and a server-side
+token store so only an opaque key ever reaches the browser
+"""
+
+import os
+import re
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import boto3
+import jwt
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger(__name__)
+
+# <region>_<id>, e.g. us-east-1_AbC123xyz or us-gov-west-1_AbC123xyz
+_USER_POOL_ID = re.compile(r"^[a-z]{2}(-[a-z]+)+-\d+_[0-9A-Za-z]+$")
+
+
+class AuthError(Exception):
+    """Sign-in, token verification or refresh failed"""
+
+
+def get_secret_hash(username: str, client_id: str, client_secret: str) -> str:
+    """Generate secret hash for Cognito authentication"""
+    message = username + client_id
+    dig = hmac.new(client_secret.encode('UTF-8'), message.encode('UTF-8'), hashlib.sha256).digest()
+    return base64.b64encode(dig).decode()
+
+
+class CognitoAuth:
+    """
+    Signs users in to a Cognito user pool and keeps their tokens valid.
+
+    ID and access tokens are verified locally: RS256 signature against the
+    pool's JWKS (fetched once and cached for jwks_ttl seconds, refetched when
+    an unknown key id appears after a rotation), issuer, expiry, token_use
+    and app client. Verifying needs no network call once the JWKS is cached.
+    ensure_fresh() exchanges the refresh token for new tokens once the access
+    token is within refresh_margin seconds of expiring.
+
+    Args:
+        user_pool_id: COGNITO_USER_POOL_ID (its prefix is the pool's region); AuthError if malformed
+        client_id: COGNITO_CLIENT_ID
+        client_secret: COGNITO_CLIENT_SECRET, for app clients that have one
+        refresh_margin: Seconds before access token expiry to refresh (COGNITO_REFRESH_MARGIN)
+        jwks_ttl: Seconds the JWKS is cached (COGNITO_JWKS_TTL)
+    """
+
+    def __init__(self, user_pool_id: str, client_id: str, client_secret: Optional[str] = None,
+                 refresh_margin: Optional[float] = None, jwks_ttl: Optional[float] = None,
+                 leeway: float = 30):
+        if not _USER_POOL_ID.match(user_pool_id or ''):
+            raise AuthError(f"COGNITO_USER_POOL_ID must look like us-east-1_AbC123xyz, got {user_pool_id!r}")
+        if not client_id:
+            raise AuthError("COGNITO_CLIENT_ID is not set")
+        self.region = user_pool_id.split('_')[0]
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = (refresh_margin if refresh_margin is not None
+                               else float(os.getenv('COGNITO_REFRESH_MARGIN', '300')))
+        self.leeway = leeway
+        self.issuer = f"https://cognito-idp.{self.region}.amazonaws.com/{user_pool_id}"
+        self.jwks = jwt.PyJWKClient(self.issuer + "/.well-known/jwks.json", cache_jwk_set=True, timeout=5,
+                                    lifespan=int(jwks_ttl or float(os.getenv('COGNITO_JWKS_TTL', '3600'))))
+        # InitiateAuth is an unsigned API, so the client needs no AWS credentials
+        self.client = boto3.client('cognito-idp', region_name=self.region)
+
+    def _auth_parameters(self, parameters: Dict[str, str], username: str) -> Dict[str, str]:
+        if self.client_secret:
+            parameters['SECRET_HASH'] = get_secret_hash(username, self.client_id, self.client_secret)
+        return parameters
+
+    def sign_in(self, username: str, password: str) -> Dict[str, Any]:
+        """Password sign-in (USER_PASSWORD_AUTH); returns a verified session"""
+        try:
+            response = self.client.initiate_auth(
+                ClientId=self.client_id,
+                AuthFlow='USER_PASSWORD_AUTH',
+                AuthParameters=self._auth_parameters({'USERNAME': username, 'PASSWORD': password}, username)
+            )
+        except (ClientError, BotoCoreError) as e:
+            raise AuthError(str(e)) from e
+
+        result = response.get('AuthenticationResult')
+        if not result:
+            raise AuthError(f"Unsupported sign-in challenge: {response.get('ChallengeName')}")
+        return self._session(result, result['RefreshToken'])
+
+    def refresh(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """New ID and access tokens from the session's refresh token (REFRESH_TOKEN_AUTH)"""
+        try:
+            response = self.client.initiate_auth(
+                ClientId=self.client_id,
+                AuthFlow='REFRESH_TOKEN_AUTH',
+                # With a client secret, the hash is over the user's Cognito username, not their email
+                AuthParameters=self._auth_parameters({'REFRESH_TOKEN': session['refresh_token']},
+                                                     session['username'])
+            )
+        except (ClientError, BotoCoreError) as e:
+            raise AuthError(f"Token refresh failed: {e}") from e
+
+        result = response['AuthenticationResult']
+        # A new refresh token only comes back when refresh token rotation is enabled
+        return self._session(result, result.get('RefreshToken') or session['refresh_token'])
+
+    def ensure_fresh(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """The session unchanged while its access token is good for refresh_margin, else refreshed"""
+        if session['expires_at'] - time.time() > self.refresh_margin:
+            return session
+        logger.info(f"Refreshing tokens for {session['email']}")
+        return self.refresh(session)
+
+    def verify(self, token: str, token_use: str) -> Dict[str, Any]:
+        """Claims of a Cognito 'id' or 'access' token, after checking signature, issuer, expiry and client"""
+        try:
+            key = self.jwks.get_signing_key_from_jwt(token)
+            claims = jwt.decode(
+                token, key.key, algorithms=['RS256'], issuer=self.issuer, leeway=self.leeway,
+                # ID tokens name the app client in aud; access tokens have no aud, only client_id
+                audience=self.client_id if token_use == 'id' else None,
+                options={'require': ['exp', 'iat', 'iss', 'token_use'], 'verify_aud': token_use == 'id'}
+            )
+        except jwt.PyJWTError as e:
+            raise AuthError(f"Invalid {token_use} token: {e}") from e
+
+        if claims['token_use'] != token_use:
+            raise AuthError(f"Expected an {token_use} token, got {claims['token_use']}")
+        if token_use == 'access' and claims.get('client_id') != self.client_id:
+            raise AuthError("Access token was issued to another app client")
+        return claims
+
+    def _session(self, result: Dict[str, Any], refresh_token: str) -> Dict[str, Any]:
+        id_claims = self.verify(result['IdToken'], 'id')
+        access_claims = self.verify(result['AccessToken'], 'access')
+        return {
+            'id_token': result['IdToken'],
+            'access_token': result['AccessToken'],
+            'refresh_token': refresh_token,
+            'expires_at': access_claims['exp'],
+            'username': access_claims.get('username') or id_claims.get('cognito:username'),
+            'email': id_claims.get('email') or id_claims.get('cognito:username')
+        }
+
+
+class TokenStore:
+    """
+    Signed-in sessions held by the Streamlit server, keyed by a random token.
+
+    Only the key goes into the page URL, so reloading the page keeps the user
+    signed in without exposing Cognito tokens. Sessions unused for idle_ttl
+    seconds are dropped (COGNITO_SESSION_IDLE_TTL). The store lives in the
+    server process: a restart signs everyone out.
+    """
+
+    def __init__(self, idle_ttl: Optional[float] = None):
+        self.idle_ttl = idle_ttl or float(os.getenv('COGNITO_SESSION_IDLE_TTL', str(7 * 24 * 3600)))
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, session: Dict[str, Any]) -> str:
+        key = secrets.token_urlsafe(32)
+        now = time.monotonic()
+        with self._lock:
+            for stale in [k for k, s in self._sessions.items() if now - s['seen_at'] > self.idle_ttl]:
+                del self._sessions[stale]
+            self._sessions[key] = {**session, 'seen_at': now}
+        return key
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or now - session['seen_at'] > self.idle_ttl:
+                self._sessions.pop(key, None)
+                return None
+            session['seen_at'] = now
+            return session
+
+    def update(self, key: str, session: Dict[str, Any]) -> None:
+        with self._lock:
+            if key in self._sessions:
+                self._sessions[key] = {**session, 'seen_at': time.monotonic()}
+
+    def remove(self, key: Optional[str]) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
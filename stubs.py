@@ -0,0 +1,288 @@
+"""
+Offline stand-ins for the agent's external backends (benchmarks and local load runs)
+"""
+
+import io
+import os
+import json
+import hashlib
+import time
+import uuid
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, List, Optional
+from strands.models import Model
+
+
+SAMPLE_CHUNKS = [
+    "Employees accrue 1.5 days of paid time off per month, up to 30 days per year. "
+    "Unused PTO rolls over into the next calendar year up to a maximum of 10 days.",
+    "Expense reports must be submitted within 30 days of purchase with itemized receipts. "
+    "Purchases above $500 require manager pre-approval.",
+    "Remote employees may work from any country with an existing company entity for up to "
+    "90 days per year after notifying HR and their manager.",
+    "Security incidents must be reported to the security team within one hour of discovery "
+    "through the incident portal or the on-call pager.",
+    "New hires complete onboarding training during their first two weeks, covering security, "
+    "compliance and the engineering handbook."
+]
+
+
+class StubKnowledgeBaseClient:
+    """Fake bedrock-agent-runtime client with configurable per-call latency"""
+
+    def __init__(self, retrieve_latency: float = 0.15, generate_latency: float = 1.5,
+                 chunks: Optional[List[str]] = None):
+        self.retrieve_latency = retrieve_latency
+        self.generate_latency = generate_latency
+        self.chunks = chunks or SAMPLE_CHUNKS
+        self.calls = {'retrieve': 0, 'retrieve_and_generate': 0}
+
+    def _results(self, count: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                'content': {'text': text},
+                'score': round(0.9 - i * 0.05, 3),
+                'location': {'type': 'S3', 's3Location': {'uri': f's3://stub-kb/doc-{i}.md'}},
+                'metadata': {'x-amz-bedrock-kb-chunk-id': f'stub-chunk-{i}'}
+            }
+            for i, text in enumerate(self.chunks[:count])
+        ]
+
+    def retrieve(self, **kwargs) -> Dict[str, Any]:
+        self.calls['retrieve'] += 1
+        time.sleep(self.retrieve_latency)
+        count = kwargs.get('retrievalConfiguration', {}).get('vectorSearchConfiguration', {}).get('numberOfResults', 5)
+        return {'retrievalResults': self._results(count)}
+
+    def retrieve_and_generate(self, **kwargs) -> Dict[str, Any]:
+        self.calls['retrieve_and_generate'] += 1
+        # Retrieval plus a generation pass inside the service
+        time.sleep(self.retrieve_latency + self.generate_latency)
+        return {'output': {'text': ' '.join(self.chunks[:2])}, 'citations': []}
+
+
+class StubEmbeddingClient:
+    """
+    Fake bedrock-runtime client answering Titan embedding requests.
+
+    Texts are embedded as hashed bags of words, so texts sharing words score
+    higher; good enough to exercise the local knowledge base index offline.
+    """
+
+    def __init__(self, latency: float = 0.02):
+        self.latency = latency
+        self.calls = 0
+
+    @staticmethod
+    def embed(text: str, dimensions: int = 256) -> List[float]:
+        vector = [0.0] * dimensions
+        for word in text.lower().split():
+            digest = hashlib.md5(word.strip('.,?!:;').encode()).digest()
+            vector[int.from_bytes(digest[:4], 'little') % dimensions] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def invoke_model(self, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        time.sleep(self.latency)
+        request = json.loads(kwargs['body'])
+        body = {'embedding': self.embed(request['inputText'], request.get('dimensions', 256)),
+                'inputTextTokenCount': len(request['inputText'].split())}
+        return {'body': io.BytesIO(json.dumps(body).encode()), 'contentType': 'application/json'}
+
+
+class _TavilyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # One handler instance per TCP connection (keep-alive reuses it)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        query = json.loads(body or b'{}').get('query', '')
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+
+        data = json.dumps({
+            'query': query,
+            'answer': f"Stub answer for: {query}",
+            'results': [
+                {
+                    'title': f"Result {i} for {query}",
+                    'url': f"https://example.com/{i}",
+                    'content': f"Stub content {i} about {query}. " * 4,
+                    'score': round(0.9 - i * 0.1, 2)
+                }
+                for i in range(3)
+            ]
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubTavilyServer(ThreadingHTTPServer):
+    """Local stand-in for the Tavily search API that counts TCP connections"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, port: int = 0, latency: float = 0.05):
+        super().__init__(('127.0.0.1', port), _TavilyHandler)
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/search"
+
+    def start(self) -> "StubTavilyServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+# Prompt keywords that make the stub model call a tool, checked in order
+_TOOL_KEYWORDS = [
+    ('research', ('research', 'compare', 'cross-check')),
+    ('knowledge_search', ('policy', 'company', 'internal', 'pto', 'expense', 'onboarding')),
+    ('web_search', ('latest', 'news', 'current', 'today', 'search')),
+]
+
+
+def _canned_value(schema: Dict[str, Any], root: Dict[str, Any], text: str) -> Any:
+    """A value matching a JSON schema: required object fields filled, strings set to text"""
+    if '$ref' in schema:
+        schema = root['$defs'][schema['$ref'].rsplit('/', 1)[-1]]
+    if 'default' in schema:
+        return schema['default']
+    if 'enum' in schema:
+        return schema['enum'][0]
+    options = schema.get('anyOf') or schema.get('oneOf')
+    if options:
+        return _canned_value(next((o for o in options if o.get('type') != 'null'), options[0]), root, text)
+    kind = schema.get('type')
+    if kind == 'object':
+        properties = schema.get('properties', {})
+        return {name: _canned_value(properties[name], root, text) for name in schema.get('required', [])}
+    return {'string': text, 'integer': 0, 'number': 0.0, 'boolean': False, 'array': [], 'null': None}.get(kind, text)
+
+
+class StubModel(Model):
+    """
+    Stand-in for BedrockModel that streams canned Bedrock converse events.
+
+    A prompt mentioning a keyword from _TOOL_KEYWORDS gets one tool call
+    first; the answer then streams word by word. Latencies model time to first
+    token and per-token generation, and reported input tokens grow with the
+    conversation so memory management shows up in the numbers.
+    """
+
+    def __init__(self, ttft: float = 0.3, token_latency: float = 0.01, answer_tokens: int = 40):
+        self.config = {'model_id': 'stub-model'}
+        self.ttft = ttft
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+
+    def update_config(self, **model_config: Any) -> None:
+        self.config.update(model_config)
+
+    def get_config(self) -> Dict[str, Any]:
+        return self.config
+
+    async def structured_output(self, output_model, prompt, system_prompt=None, **kwargs):
+        """An instance of output_model whose required fields hold canned values of their types"""
+        texts = [block['text'] for block in prompt[-1]['content'] if 'text' in block] if prompt else []
+        schema = output_model.model_json_schema()
+        await asyncio.sleep(self.ttft)
+        yield {'output': output_model(**_canned_value(schema, schema, f"Stub answer to: {' '.join(texts)[:80]}"))}
+
+    def _pick_tool(self, text: str, tool_specs: Optional[List[Dict[str, Any]]]) -> Optional[str]:
+        available = {spec['name'] for spec in tool_specs or []}
+        lowered = text.lower()
+        for name, keywords in _TOOL_KEYWORDS:
+            if name in available and any(word in lowered for word in keywords):
+                return name
+        return None
+
+    async def stream(self, messages, tool_specs=None, system_prompt=None, **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        last = messages[-1]
+        # The last text block is the user's prompt; earlier ones may carry a conversation summary
+        texts = [block['text'] for block in last['content'] if 'text' in block]
+        text = texts[-1] if texts else ''
+        after_tool = any('toolResult' in block for block in last['content'])
+        tool_name = None if after_tool else self._pick_tool(text, tool_specs)
+
+        input_tokens = (len(json.dumps(messages, default=str)) + len(system_prompt or '')) // 4
+        await asyncio.sleep(self.ttft)
+        yield {'messageStart': {'role': 'assistant'}}
+
+        if tool_name:
+            tool_input = {'queries': [text]} if tool_name == 'research' else {'query': text}
+            yield {'contentBlockStart': {'start': {'toolUse': {'toolUseId': uuid.uuid4().hex, 'name': tool_name}}}}
+            yield {'contentBlockDelta': {'delta': {'toolUse': {'input': json.dumps(tool_input)}}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'tool_use'}}
+            output_tokens = 20
+        else:
+            words = (f"Stub answer to: {text[:80]} " + "lorem ipsum " * self.answer_tokens).split()
+            for word in words[:self.answer_tokens]:
+                await asyncio.sleep(self.token_latency)
+                yield {'contentBlockDelta': {'delta': {'text': word + ' '}}}
+            yield {'contentBlockStop': {}}
+            yield {'messageStop': {'stopReason': 'end_turn'}}
+            output_tokens = self.answer_tokens
+
+        yield {'metadata': {
+            'usage': {'inputTokens': input_tokens, 'outputTokens': output_tokens,
+                      'totalTokens': input_tokens + output_tokens},
+            'metrics': {'latencyMs': int(self.ttft * 1000)}
+        }}
+
+
+def _stub_ms(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default))) / 1000
+
+
+def use_stub_backends() -> StubModel:
+    """
+    Point the tools at in-process stubs and return a stub model, so the agent
+    runs fully offline (AGENT_STUB_BACKENDS=true). Latencies come from the
+    STUB_*_MS environment variables.
+    """
+    from aws_clients import register_client
+
+    server = StubTavilyServer(latency=_stub_ms('STUB_TAVILY_MS', 50)).start()
+    os.environ['TAVILY_API_URL'] = server.url
+    os.environ.setdefault('TAVILY_API_KEY', 'stub')
+    os.environ.setdefault('KNOWLEDGE_BASE_ID', 'stub-kb')
+    register_client('bedrock-agent-runtime', StubKnowledgeBaseClient(
+        retrieve_latency=_stub_ms('STUB_KB_RETRIEVE_MS', 150),
+        generate_latency=_stub_ms('STUB_KB_GENERATE_MS', 1500)
+    ))
+    # Query embeddings for the local knowledge base index (KB_LOCAL_INDEX)
+    register_client('bedrock-runtime', StubEmbeddingClient(latency=_stub_ms('STUB_EMBED_MS', 20)))
+    return StubModel(
+        ttft=_stub_ms('STUB_MODEL_TTFT_MS', 300),
+        token_latency=_stub_ms('STUB_MODEL_TOKEN_MS', 10)
+    )
@@ -0,0 +1,203 @@
+"""
+Bounded in-process TTL + LRU cache for tool results
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from disk_cache import DiskCache
+
+# Punctuation at the edges of a whitespace-separated token. A dot opening a word (.net) and
+# + or # closing one (c++, c#) are part of the token; so is anything inside one (node.js)
+_EDGE_PUNCTUATION = re.compile(r"(?<!\S)(?:\.(?!\w)|[^\w\s.])+|[^\w\s+#]+(?!\S)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for cache keys: case, whitespace and surrounding punctuation
+    insensitive, while "C++", "C#" and "C", or ".NET" and "NET", stay distinct
+    """
+    text = _EDGE_PUNCTUATION.sub("", query.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _sizeof(value: Any) -> int:
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and a memory cap.
+
+    Values are shared between callers and must not be mutated. None is never
+    cached, so get() returning None always means a miss.
+
+    With a disk cache, entries are written through to it and in-process
+    misses are read from it, so other worker processes and restarted ones
+    share results. Values must then be JSON-serializable. A clear() in any
+    process bumps the disk generation, and every other process drops its
+    in-process entries within disk_sync_interval seconds. Coroutines use
+    get_async() and set_async(), which answer in-process hits inline and run
+    every disk read and write in a thread.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, disk: Optional["DiskCache"] = None,
+                 disk_sync_interval: Optional[float] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries or int(os.getenv('TOOL_CACHE_MAX_ENTRIES', '2048'))
+        self.max_bytes = max_bytes or int(os.getenv('TOOL_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk = disk
+        self.disk_hits = 0
+        self.disk_sync_interval = (disk_sync_interval if disk_sync_interval is not None
+                                   else float(os.getenv('TOOL_CACHE_DISK_SYNC_INTERVAL', '1')))
+        self._disk_generation = disk.generation(name) if disk is not None else 0
+        self._disk_checked_at = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        if not self.enabled:
+            return None
+        if self.disk is None:
+            return self._get_local(key)
+        self._sync_disk_generation()
+        value = self._get_local(key)
+        return value if value is not None else self._get_disk(key)
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get() for the event loop: only the disk tier runs off the loop"""
+        if not self.enabled:
+            return None
+        if self.disk is None:
+            return self._get_local(key)
+        if self._disk_sync_due():
+            await asyncio.to_thread(self._sync_disk_generation)
+        value = self._get_local(key)
+        return value if value is not None else await asyncio.to_thread(self._get_disk, key)
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _get_disk(self, key: str) -> Optional[Any]:
+        """Read an in-process miss from the disk cache, keeping the entry's remaining TTL"""
+        entry = self.disk.get(self.name, key)
+        if entry is None:
+            return None
+        value, ttl = entry
+        with self._lock:
+            self.disk_hits += 1
+        self._set_local(key, value, min(ttl, self.ttl))
+        return value
+
+    def _disk_sync_due(self) -> bool:
+        return time.monotonic() - self._disk_checked_at >= self.disk_sync_interval
+
+    def _sync_disk_generation(self) -> None:
+        """Drop in-process entries once another process has cleared the disk cache"""
+        if not self._disk_sync_due():
+            return
+        self._disk_checked_at = time.monotonic()
+        generation = self.disk.generation(self.name)
+        if generation != self._disk_generation:
+            self._disk_generation = generation
+            self._clear_local()
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting least recently used entries past the caps; ttl may only shorten the cache's"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or value is None:
+            return
+        self._set_local(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(self.name, key, value, ttl)
+
+    async def set_async(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """set() for the event loop: the in-process entry is stored inline, the disk write in a thread"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or value is None:
+            return
+        self._set_local(key, value, ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, self.name, key, value, ttl)
+
+    def _set_local(self, key: str, value: Any, ttl: float) -> None:
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, in every process sharing the disk cache (counters are kept)"""
+        if self.disk is not None:
+            self.disk.clear(self.name)
+            self._disk_generation = self.disk.generation(self.name)
+        self._clear_local()
+
+    def _clear_local(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_hits": self.disk_hits
+            }
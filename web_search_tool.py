@@ -3,72 +3,304 @@ Tavily web search tool for external data sourcing
 """
 
 import os
-import requests
+import atexit
+import asyncio
 import logging
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from strands import tool
+from tool_cache import TTLCache, normalize_query
+from disk_cache import shared_disk_cache
+from singleflight import SingleFlight
+from observability import record_span, span
+from prefetch import use_prefetched, use_prefetched_async
+from context_packing import estimate_tokens, join_excerpts, pack
+
+if TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 
+# Raw Tavily responses, keyed on the normalized query; shared across processes on disk
+# when TOOL_CACHE_DISK_PATH is set
+web_cache = TTLCache('web_search', ttl=float(os.getenv('WEB_CACHE_TTL', '300')), disk=shared_disk_cache())
+
+# Concurrent misses for the same normalized query share one Tavily call. Async calls run on
+# the I/O loop, which outlives the per-invocation loops of the callers waiting on them
+web_flight = SingleFlight('web_search', loop=lambda: _get_io_loop())
+
+DEFAULT_TAVILY_URL = "https://api.tavily.com/search"
+
+# One keep-alive requests session for the threaded tool, and one aiohttp session
+# for the async tool. Strands runs each agent invocation on a fresh event loop,
+# so the aiohttp session lives on a dedicated I/O loop thread and its connection
+# pool is shared by every caller instead of being rebuilt per loop.
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+_io_loop: Optional[asyncio.AbstractEventLoop] = None
+_io_session: Any = None
+
+
+def _pool_size() -> int:
+    return int(os.getenv('WEB_SEARCH_POOL_SIZE', '32'))
+
+
+def _timeout() -> float:
+    return float(os.getenv('WEB_SEARCH_TIMEOUT', '10'))
+
+
+def get_http_session() -> "requests.Session":
+    """Return the shared, connection-pooled requests session"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Imported on first use: only the threaded tool needs requests
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=_pool_size())
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _get_io_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop that owns the async HTTP client"""
+    global _io_loop
+    if _io_loop is None:
+        with _session_lock:
+            if _io_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="web-search-io", daemon=True).start()
+                _io_loop = loop
+    return _io_loop
+
+
+def _get_io_session() -> Any:
+    """Return the keep-alive aiohttp session; only called on the I/O loop"""
+    global _io_session
+    import aiohttp
+
+    if _io_session is None or _io_session.closed:
+        _io_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=_pool_size(),
+                keepalive_timeout=float(os.getenv('WEB_SEARCH_KEEPALIVE', '30'))
+            ),
+            timeout=aiohttp.ClientTimeout(total=_timeout())
+        )
+    return _io_session
+
+
+async def _io_post(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST on the I/O loop using the shared keep-alive aiohttp session"""
+    async with _get_io_session().post(url, json=payload) as response:
+        response.raise_for_status()
+        return await response.json(content_type=None)
+
+
+async def _io_head(url: str) -> None:
+    """Open a keep-alive connection on the I/O loop's session; the status is irrelevant"""
+    async with _get_io_session().head(url) as response:
+        await response.read()
+
+
+async def _io_close() -> None:
+    global _io_session
+    if _io_session is not None:
+        await _io_session.close()
+        _io_session = None
+
+
+def reset_http_clients() -> None:
+    """Close the shared HTTP clients so the next call reconnects"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+    if _io_loop is not None:
+        asyncio.run_coroutine_threadsafe(_io_close(), _io_loop).result()
+
+
+@atexit.register
+def _close_at_exit() -> None:
+    """Close the aiohttp session while its loop is still running"""
+    if _io_loop is not None and _io_session is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(_io_close(), _io_loop).result(timeout=2)
+        except Exception:
+            pass
+
+
+def warm_connection(use_async: bool = True) -> None:
+    """
+    Resolve DNS and finish the TLS handshake with Tavily ahead of the first
+    search, leaving a pooled keep-alive connection behind
+    """
+    url = os.getenv('TAVILY_API_URL', DEFAULT_TAVILY_URL)
+    if use_async:
+        asyncio.run_coroutine_threadsafe(_io_head(url), _get_io_loop()).result(timeout=_timeout())
+    else:
+        get_http_session().head(url, timeout=_timeout())
+
+
+def prefetch_search(query: str) -> Future:
+    """Start a search on the I/O loop in the background; the Future can be cancelled"""
+    return asyncio.run_coroutine_threadsafe(search_web_async(query), _get_io_loop())
+
+
+def _build_payload(api_key: str, query: str) -> Dict[str, Any]:
+    return {
+        "api_key": api_key,
+        "query": query,
+        "search_depth": "basic",
+        "include_answer": True,
+        "include_images": False,
+        "include_raw_content": False,
+        # Extra candidates for context packing to choose from; Tavily basic search costs the same
+        "max_results": int(os.getenv('WEB_MAX_RESULTS', '5'))
+    }
+
+
+def _token_budget() -> int:
+    return int(os.getenv('WEB_TOKEN_BUDGET', '400'))
+
+
+def format_sources(results: List[Dict[str, Any]], query: str, token_budget: int) -> List[str]:
+    """Numbered sources with the passages most relevant to query, within a token budget"""
+    documents = [{**result, 'text': result.get('content') or ''} for result in results]
+    lines = []
+    # Web pages mix topics: a passage sharing no term with the query is rarely worth its tokens
+    packed = pack(query, documents, token_budget, require_match=True,
+                  overhead=lambda r: estimate_tokens(f"1. {r.get('title', 'No title')} {r.get('url', 'No URL')}"))
+    for i, (result, excerpts) in enumerate(packed, 1):
+        lines.append(f"{i}. {result.get('title', 'No title')}")
+        lines.append(f"   {join_excerpts(excerpts)}")
+        lines.append(f"   {result.get('url', 'No URL')}")
+    return lines
+
+
+def format_results(data: Dict[str, Any], query: str = "") -> str:
+    """Format a Tavily response for the model, packing sources into WEB_TOKEN_BUDGET"""
+    results = []
+
+    # Add direct answer if available
+    if data.get('answer'):
+        results.append(f"**Answer:** {data['answer']}")
+
+    # Add the most relevant passages of the search results
+    sources = format_sources(data.get('results') or [], query or data.get('query', ''),
+                             _token_budget() - estimate_tokens("\n".join(results)))
+    if sources:
+        results.append("**Sources:**")
+        results.extend(sources)
+
+    return "\n".join(results) if results else "No search results found."
+
+
+def search_web(query: str) -> Dict[str, Any]:
+    """Run a Tavily search over the shared session and return the raw response"""
+    data = use_prefetched("web", query, _timeout())
+    if data is not None:
+        return data
+
+    key = normalize_query(query)
+    data = web_cache.get(key)
+    if data is not None:
+        logger.info(f"Web search cache hit for: {query}")
+        record_span("cache", "web_search", 0.0, hit=True)
+        return data
+
+    def fetch() -> Dict[str, Any]:
+        url = os.getenv('TAVILY_API_URL', DEFAULT_TAVILY_URL)
+        payload = _build_payload(os.getenv('TAVILY_API_KEY'), query)
+
+        logger.info(f"Searching Tavily for: {query}")
+        with span("http", "tavily.search") as attributes:
+            response = get_http_session().post(url, json=payload, timeout=_timeout())
+            attributes["status_code"] = response.status_code
+            response.raise_for_status()
+
+        data = response.json()
+        web_cache.set(key, data)
+        return data
+
+    return web_flight.do(key, fetch, timeout=_timeout())
+
+
+async def search_web_async(query: str) -> Dict[str, Any]:
+    """Run a Tavily search without blocking a thread and return the raw response"""
+    data = await use_prefetched_async("web", query, _timeout())
+    if data is not None:
+        return data
+
+    key = normalize_query(query)
+    data = await web_cache.get_async(key)
+    if data is not None:
+        logger.info(f"Web search cache hit for: {query}")
+        record_span("cache", "web_search", 0.0, hit=True)
+        return data
+
+    async def fetch() -> Dict[str, Any]:
+        url = os.getenv('TAVILY_API_URL', DEFAULT_TAVILY_URL)
+        payload = _build_payload(os.getenv('TAVILY_API_KEY'), query)
+
+        logger.info(f"Searching Tavily (async) for: {query}")
+        with span("http", "tavily.search"):
+            future = asyncio.run_coroutine_threadsafe(_io_post(url, payload), _get_io_loop())
+            data = await asyncio.wrap_future(future)
+        await web_cache.set_async(key, data)
+        return data
+
+    return await web_flight.do_async(key, fetch, timeout=_timeout())
+
+
 @tool
 def web_search(query: str) -> str:
     """
     Search the web for current information using Tavily.
     Use this when you need up-to-date information, news, or facts.
-    
+
     Args:
         query: The search query string
-        
+
     Returns:
         Search results with relevant information
     """
-    api_key = os.getenv('TAVILY_API_KEY')
-    
-    if not api_key:
+    if not os.getenv('TAVILY_API_KEY'):
         return "Web search is not available (no API key configured)."
-    
+
     try:
-        url = "https://api.tavily.com/search"
-        payload = {
-            "api_key": api_key,
-            "query": query,
-            "search_depth": "basic",
-            "include_answer": True,
-            "include_images": False,
-            "include_raw_content": False,
-            "max_results": 3
-        }
-        
-        logger.info(f"Searching Tavily for: {query}")
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Format results
-        results = []
-        
-        # Add direct answer if available
-        if data.get('answer'):
-            results.append(f"**Answer:** {data['answer']}")
-        
-        # Add search results
-        if data.get('results'):
-            results.append("**Sources:**")
-            for i, result in enumerate(data['results'][:3], 1):
-                title = result.get('title', 'No title')
-                content = result.get('content', 'No content')
-                url = result.get('url', 'No URL')
-                
-                # Truncate content if too long
-                if len(content) > 150:
-                    content = content[:150] + "..."
-                
-                results.append(f"{i}. {title}")
-                results.append(f"   {content}")
-                results.append(f"   {url}")
-        
-        return "\n".join(results) if results else "No search results found."
-        
+        return format_results(search_web(query), query)
+
+    except Exception as e:
+        logger.error(f"Tavily search error: {e}")
+        return f"Search failed: {str(e)}"
+
+
+@tool(name="web_search")
+async def web_search_async(query: str) -> str:
+    """
+    Search the web for current information using Tavily.
+    Use this when you need up-to-date information, news, or facts.
+
+    Args:
+        query: The search query string
+
+    Returns:
+        Search results with relevant information
+    """
+    if not os.getenv('TAVILY_API_KEY'):
+        return "Web search is not available (no API key configured)."
+
+    try:
+        return format_results(await search_web_async(query), query)
+
     except Exception as e:
         logger.error(f"Tavily search error: {e}")
         return f"Search failed: {str(e)}"